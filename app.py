@@ -1,12 +1,62 @@
+import importlib
+import time
 import streamlit as st
 from auth import login_page, register_page
-from text_summarizer import summarize_page
-from translator import translate_page
-from file_processor import file_upload_page
-from sentiment_analyzer import sentiment_page
-from similarity_checker import similarity_page
-from visualizations import visualizations_page
-from text_to_speech import tts_page
+import resources
+import tracing
+
+# Page modules are imported on first navigation so the login screen does not
+# wait for spaCy, NLTK or scikit-learn to load
+PAGES = {
+    "Summarize Text": ("text_summarizer", "summarize_page"),
+    "Translate Text": ("translator", "translate_page"),
+    "Upload File": ("file_processor", "file_upload_page"),
+    "Sentiment Analysis": ("sentiment_analyzer", "sentiment_page"),
+    "Text Similarity": ("similarity_checker", "similarity_page"),
+    "Visualizations": ("visualizations", "visualizations_page"),
+    "Text-to-Speech": ("text_to_speech", "tts_page"),
+    "History": ("history", "history_page")
+}
+
+def load_page(name):
+    module_name, func_name = PAGES[name]
+    return getattr(importlib.import_module(module_name), func_name)
+
+def performance_panel(profile):
+    """Per-stage latency, metric downloads and the last profile (shown while tracing is on)"""
+    from rendering import render_bar_chart
+    data = tracing.snapshot()
+    if data['spans']:
+        st.dataframe({
+            'stage': list(data['spans']),
+            'calls': [s['count'] for s in data['spans'].values()],
+            'p50 ms': [round(s['p50'] * 1000, 1) for s in data['spans'].values()],
+            'p95 ms': [round(s['p95'] * 1000, 1) for s in data['spans'].values()],
+            'max ms': [round(s['max'] * 1000, 1) for s in data['spans'].values()],
+        }, hide_index=True)
+        stage = st.selectbox("Latency histogram", list(data['spans']))
+        buckets = [(f"≤ {le} s", n) for le, n in data['spans'][stage]['buckets'].items()]
+        st.image(render_bar_chart(buckets, title="Calls", figsize=(4, 4)))
+    else:
+        st.caption("No spans recorded yet.")
+    if data['counters']:
+        st.dataframe({'event': list(data['counters']), 'count': list(data['counters'].values())},
+                     hide_index=True)
+    st.download_button("Prometheus metrics", tracing.to_prometheus(), file_name="metrics.prom", mime="text/plain")
+    st.download_button("JSON metrics", tracing.to_json(), file_name="metrics.json", mime="application/json")
+    if st.button("Reset metrics"):
+        tracing.reset()
+        st.rerun()
+    
+    if profile:
+        st.markdown(f"**Profile** ({profile['samples']} samples, {profile['seconds']:.2f} s)")
+        st.dataframe({
+            'function': [f for f, _, _ in profile['top']],
+            'self': [own for _, own, _ in profile['top']],
+            'total': [total for _, _, total in profile['top']],
+        }, hide_index=True)
+        st.download_button("Collapsed stacks (flame graph)", profile['collapsed'],
+                           file_name="profile.folded", mime="text/plain")
 
 def init_session_state():
     if 'logged_in' not in st.session_state:
@@ -19,6 +69,8 @@ def init_session_state():
 def main():
     init_session_state()
     st.set_page_config(page_title="AI-POWERED INSIGHT GENERATOR", layout="wide")
+    # Start loading models in the background while the user logs in
+    resources.warm_up()
 
     if not st.session_state.logged_in:
         st.title("AI-POWERED INSIGHT GENERATOR")
@@ -29,17 +81,35 @@ def main():
             register_page()
     else:
         st.sidebar.title(f"Welcome, {st.session_state.username}")
-        options = {
-            "Summarize Text": summarize_page,
-            "Translate Text": translate_page,
-            "Upload File": file_upload_page,
-            "Sentiment Analysis": sentiment_page,
-            "Text Similarity": similarity_page,
-            "Visualizations": visualizations_page,
-            "Text-to-Speech": tts_page
-        }
-        selected = st.sidebar.radio("Navigation", list(options.keys()))
-        options[selected]()
+        selected = st.sidebar.radio("Navigation", list(PAGES.keys()))
+        
+        panel = st.sidebar.expander("Performance")
+        with panel:
+            # Metrics are process-wide, shared by every session: show the current flag and
+            # change it only when this session toggles the box
+            st.session_state.tracing_enabled = tracing.ENABLED
+            st.checkbox("Enable tracing", key="tracing_enabled",
+                        on_change=lambda: tracing.enable(st.session_state.tracing_enabled))
+            run_profiler = tracing.ENABLED and st.button("Profile this page once")
+        
+        page = load_page(selected)
+        if run_profiler:
+            start = time.perf_counter()
+            with tracing.SamplingProfiler() as profiler:
+                page()
+            st.session_state.last_profile = {
+                'samples': profiler.samples,
+                'seconds': time.perf_counter() - start,
+                'top': profiler.top_functions(),
+                'collapsed': profiler.collapsed(),
+            }
+        else:
+            with tracing.span(f"page.{PAGES[selected][0]}"):
+                page()
+        
+        if tracing.ENABLED:
+            with panel:
+                performance_panel(st.session_state.get('last_profile'))
 
         if st.sidebar.button("Logout"):
             st.session_state.logged_in = False
@@ -2,30 +2,43 @@ import streamlit as st
 import sqlite3
 import hashlib  # For basic password hashing
 from datetime import datetime
+import resources
+from db import DB_PATH, Database
+from history import init_store
+from jobs import init_jobs
 
 # Initialize SQLite database
-def init_db():
-    conn = sqlite3.connect('app.db', check_same_thread=False)
-    c = conn.cursor()
+def init_db(path=DB_PATH):
+    db = Database(path)
     
-    # Create users table with additional safety fields
-    c.execute('''CREATE TABLE IF NOT EXISTS users
-                 (username TEXT PRIMARY KEY, 
-                  password TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
-    
-    # Create texts table with foreign key relationship
-    c.execute('''CREATE TABLE IF NOT EXISTS texts
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  text TEXT NOT NULL, 
-                  username TEXT NOT NULL,
-                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                  FOREIGN KEY(username) REFERENCES users(username))''')
+    with db.transaction() as c:
+        # Create users table with additional safety fields
+        c.execute('''CREATE TABLE IF NOT EXISTS users
+                     (username TEXT PRIMARY KEY, 
+                      password TEXT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+        
+        # Create texts table with foreign key relationship
+        c.execute('''CREATE TABLE IF NOT EXISTS texts
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                      text TEXT NOT NULL, 
+                      username TEXT NOT NULL,
+                      created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                      FOREIGN KEY(username) REFERENCES users(username))''')
+        
+        # Indexes and full-text search for saved texts
+        init_store(c)
+        
+        # Background jobs and their persisted results
+        init_jobs(c)
     
-    conn.commit()
-    return conn
+    return db
+
+# The database is opened on first use rather than at import time
+resources.register('db', init_db)
 
-conn = init_db()
+def get_db():
+    return resources.get('db')
 
 # Password hashing function
 def hash_password(password):
@@ -60,9 +73,8 @@ def register_page():
                 
             try:
                 hashed_pw = hash_password(password)
-                conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", 
-                            (username, hashed_pw))
-                conn.commit()
+                get_db().execute("INSERT INTO users (username, password) VALUES (?, ?)", 
+                                 (username, hashed_pw))
                 st.success("Registration successful! Please log in.")
             except sqlite3.IntegrityError:
                 st.error("Username already exists")
@@ -83,9 +95,7 @@ def login_page():
                 return
                 
             try:
-                c = conn.cursor()
-                c.execute("SELECT password FROM users WHERE username=?", (username,))
-                result = c.fetchone()
+                result = get_db().query_one("SELECT password FROM users WHERE username=?", (username,))
                 
                 if result:
                     stored_hash = result[0]
@@ -0,0 +1,228 @@
+"""Analyze a folder of documents without the Streamlit UI.
+
+    python batch_cli.py documents/ --output results.jsonl --workers 8
+
+Every PDF, DOCX or TXT file under the folder gets one JSON line with its
+keywords, summary, sentiment scores and a MinHash signature. Lines are
+written as soon as each file finishes, so an interrupted run resumes where
+it stopped: files already in the output are skipped (including files that
+failed, whose line carries an "error" instead of results). With --duplicates,
+near-duplicate groups across the whole output are written to a second file.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+EXTENSIONS = ('.pdf', '.docx', '.txt')
+SUMMARY_WORDS = 100
+TOP_KEYWORDS = 20
+# Files queued per worker; bounds how many documents are in memory at once
+IN_FLIGHT_PER_WORKER = 2
+
+_options = {}
+
+
+def iter_files(root, recursive=True):
+    """Paths of supported files under root, in a stable order"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.lower().endswith(EXTENSIONS):
+                yield os.path.join(dirpath, name)
+        if not recursive:
+            break
+
+
+def read_done(output):
+    """Paths already recorded in the output; drops a partially written last line"""
+    done = set()
+    if not os.path.exists(output):
+        return done
+    with open(output, 'rb+') as f:
+        good = 0
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                done.add(json.loads(line)['path'])
+            except (ValueError, KeyError):
+                pass
+            good += len(line)
+        f.truncate(good)
+    return done
+
+
+def extract_file_text(path):
+    """Plain text of a PDF, DOCX or TXT file, using the upload page's extractors"""
+    from file_processor import iter_pdf_pages, iter_docx_paragraphs
+    lower = path.lower()
+    if lower.endswith('.pdf'):
+        with open(path, 'rb') as f:
+            return " ".join(iter_pdf_pages(f.read(), workers=1))
+    if lower.endswith('.docx'):
+        return " ".join(iter_docx_paragraphs(path))
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return f.read()
+
+
+def _init_worker(options):
+    """Load every model once per worker process"""
+    import resources
+    _options.update(options)
+    for name in ('spacy', 'vader', 'stopwords', 'wordnet'):
+        resources.get(name)
+    if options['match_saved']:
+        resources.get('similarity_index')
+
+
+def process_file(path):
+    """Result record for one file; errors are recorded rather than raised"""
+    import document_analysis
+    import incremental
+    import sentence_index
+    import tokenizer
+    from near_duplicates import NearDuplicateDetector
+    from sentiment_analyzer import analyze_sentiment
+    from text_summarizer import extract_quality_keywords, improved_summarize
+
+    start = time.perf_counter()
+    record = {'path': path}
+    try:
+        text = extract_file_text(path)
+        record['characters'] = len(text)
+        if text.strip():
+            # Parse in this process only: the pool already has a worker per core. Keywords and
+            # the summary then reuse this profile instead of starting spaCy processes of their own
+            incremental.lexical_profile(text, n_process=1)
+            record['keywords'] = extract_quality_keywords(text, _options['keywords'])
+            summary, summary_words = improved_summarize(text, _options['summary_words'])
+            record['summary'] = summary
+            record['summary_words'] = summary_words
+            sentiment = analyze_sentiment(text)
+            record['sentiment'] = dict(sentiment['scores'],
+                                       positive_sentences=len(sentiment['positive']),
+                                       negative_sentences=len(sentiment['negative']),
+                                       neutral_sentences=len(sentiment['neutral']))
+            signature = NearDuplicateDetector(_options['threshold']).signature(text)
+            record['minhash'] = base64.b64encode(signature.tobytes()).decode('ascii')
+            if _options['match_saved']:
+                from similarity_index import get_index
+                record['similar_saved'] = get_index().query(text, _options['match_saved'], owner=_options['owner'])
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    finally:
+        # One document at a time per worker: don't let the caches hold on to it
+        document_analysis.clear_cache()
+        sentence_index.clear_cache()
+        tokenizer.clear_cache()
+        incremental.clear_cache()
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def run(paths, output, workers, options, log=print):
+    """Process paths across a pool, appending each record to output as it completes"""
+    in_flight = workers * IN_FLIGHT_PER_WORKER
+    processed = failed = 0
+    with open(output, 'a', encoding='utf-8') as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(options,)) as pool:
+        pending = set()
+        paths = iter(paths)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < in_flight:
+                path = next(paths, None)
+                if path is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(process_file, path))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record = future.result()
+                out.write(json.dumps(record, ensure_ascii=False) + '\n')
+                out.flush()
+                processed += 1
+                if 'error' in record:
+                    failed += 1
+                    log(f"failed  {record['path']}: {record['error']}")
+                else:
+                    log(f"done    {record['path']} ({record['seconds']} s)")
+    return processed, failed
+
+
+def find_duplicates(output, threshold):
+    """Near-duplicate groups of paths among every record in the output file"""
+    from near_duplicates import NearDuplicateDetector
+    detector = NearDuplicateDetector(threshold)
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if 'minhash' in record:
+                signature = np.frombuffer(base64.b64decode(record['minhash']), dtype=np.uint32)
+                detector.add_signature(record['path'], signature)
+    return detector.clusters()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze every PDF, DOCX and TXT file in a folder")
+    parser.add_argument('input', help="folder to scan")
+    parser.add_argument('-o', '--output', default='results.jsonl', help="JSONL file to append results to")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--no-recursive', action='store_true', help="only scan the top-level folder")
+    parser.add_argument('--summary-words', type=int, default=SUMMARY_WORDS)
+    parser.add_argument('--keywords', type=int, default=TOP_KEYWORDS)
+    parser.add_argument('--match-saved', type=int, default=0, metavar='K',
+                        help="also list the K most similar texts from the saved-text index")
+    parser.add_argument('--owner', metavar='USERNAME',
+                        help="with --match-saved, only match texts saved by this user")
+    parser.add_argument('--duplicates', metavar='PATH',
+                        help="write near-duplicate groups across the output to this JSON file")
+    parser.add_argument('--threshold', type=float, default=0.8, help="near-duplicate Jaccard threshold")
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.input):
+        parser.error(f"{args.input} is not a folder")
+    done = read_done(args.output)
+    paths = (p for p in iter_files(args.input, not args.no_recursive) if p not in done)
+    options = {
+        'summary_words': args.summary_words,
+        'keywords': args.keywords,
+        'match_saved': args.match_saved,
+        'owner': args.owner,
+        'threshold': args.threshold,
+    }
+    log = (lambda message: None) if args.quiet else print
+    if done:
+        log(f"Resuming: {len(done)} files already in {args.output}")
+    if args.match_saved:
+        # Bring the index on disk up to date once, before the workers load it
+        from auth import get_db
+        from similarity_index import get_index
+        added = get_index().sync_from_db(get_db())
+        if added:
+            log(f"Indexed {added} newly saved texts")
+
+    start = time.perf_counter()
+    processed, failed = run(paths, args.output, max(1, args.workers), options, log)
+    elapsed = time.perf_counter() - start
+    print(f"Processed {processed} files ({failed} failed) in {elapsed:.1f} s", file=sys.stderr)
+
+    if args.duplicates:
+        groups = find_duplicates(args.output, args.threshold)
+        with open(args.duplicates, 'w', encoding='utf-8') as f:
+            json.dump(groups, f, indent=2)
+        print(f"{len(groups)} near-duplicate groups written to {args.duplicates}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
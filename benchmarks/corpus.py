@@ -0,0 +1,76 @@
+"""Deterministic synthetic documents for the benchmark suite."""
+import random
+
+# Small fixed vocabulary with a long tail, so keyword and lemma code sees realistic repetition
+_NOUNS = ("market report customer product revenue growth team strategy analysis quarter "
+          "service platform feature budget risk forecast region partner contract policy "
+          "system model data insight survey review price margin channel campaign launch").split()
+_VERBS = ("increase reduce improve deliver expand launch measure review report support "
+          "drive lower raise build plan track grow shift manage test").split()
+_ADJECTIVES = ("strong weak stable new major key global local early late positive negative "
+               "steady rapid slow critical clear uncertain").split()
+_OPENERS = ("However, Meanwhile, In addition, Overall, As a result, In contrast, Notably,").split(",")
+_SENTIMENT = ("We are very happy with the excellent results. ",
+              "This was a terrible and disappointing outcome. ",
+              "The numbers were roughly in line with expectations. ")
+
+
+def _sentence(rng):
+    words = []
+    opener = rng.choice(_OPENERS).strip()
+    if opener and rng.random() < 0.3:
+        words.append(opener + ",")
+    for _ in range(rng.randint(2, 5)):
+        words.append(f"the {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}")
+        words.append(rng.choice(_VERBS) + rng.choice(["s", "ed", "", "ing"]))
+        # Rare tail words keep the vocabulary growing with document size
+        words.append(rng.choice(_NOUNS) + (str(rng.randint(1, 500)) if rng.random() < 0.05 else "s"))
+    sentence = " ".join(words)
+    return sentence[0].upper() + sentence[1:] + rng.choice([".", ".", ".", "!", "?"]) + " "
+
+
+def generate_text(n_words, seed=0):
+    """About ``n_words`` words of English-like prose in paragraphs; same output for the same seed"""
+    rng = random.Random(seed)
+    parts = []
+    count = 0
+    sentences_in_paragraph = 0
+    while count < n_words:
+        if rng.random() < 0.1:
+            sentence = rng.choice(_SENTIMENT)
+        else:
+            sentence = _sentence(rng)
+        parts.append(sentence)
+        count += len(sentence.split())
+        sentences_in_paragraph += 1
+        if sentences_in_paragraph >= rng.randint(4, 8):
+            parts.append("\n\n")
+            sentences_in_paragraph = 0
+    return "".join(parts).strip()
+
+
+def write_docx(path, text):
+    from docx import Document
+    doc = Document()
+    for paragraph in text.split("\n\n"):
+        doc.add_paragraph(paragraph)
+    doc.save(path)
+
+
+def write_pdf(path, text, lines_per_page=50, chars_per_line=95):
+    """Text-only PDF rendered with matplotlib, which pdfplumber can extract"""
+    import textwrap
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_pdf import PdfPages
+    from matplotlib.figure import Figure
+
+    lines = []
+    for paragraph in text.split("\n\n"):
+        lines.extend(textwrap.wrap(paragraph, chars_per_line) + [""])
+    with PdfPages(path) as pdf:
+        for start in range(0, len(lines), lines_per_page):
+            fig = Figure(figsize=(8.5, 11))
+            fig.text(0.05, 0.97, "\n".join(lines[start:start + lines_per_page]),
+                     va="top", family="monospace", fontsize=8)
+            pdf.savefig(fig)
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""Benchmark suite for the analysis hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.run --sizes 1000 10000 100000
+    python -m benchmarks.run --save-baseline          # record benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Each benchmark is timed on its own and then run again under tracemalloc
+for peak memory. Translation and text-to-speech use the offline stub
+backends, so the whole suite runs without network access. TF-IDF keywords
+read a throwaway database and similarity index in a temporary directory,
+never the app's app.db and similarity_index/.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.corpus import generate_text, write_docx, write_pdf
+
+DEFAULT_SIZES = [1000, 10000, 100000, 500000]
+# Generating and extracting PDFs is slow, so file benchmarks stop at this size by default
+DEFAULT_FILE_MAX_WORDS = 100000
+DEFAULT_TOLERANCE = 1.25
+RESULTS_PATH = os.path.join('benchmarks', 'results.json')
+BASELINE_PATH = os.path.join('benchmarks', 'baseline.json')
+
+
+class UploadedFile(io.BytesIO):
+    """Stand-in for Streamlit's UploadedFile: bytes plus a MIME type"""
+
+    def __init__(self, data, name, mime_type):
+        super().__init__(data)
+        self.name = name
+        self.type = mime_type
+
+
+def clear_caches():
+    """Drop every in-memory cache so each measurement starts cold"""
+    import document_analysis
+    import incremental
+    import rendering
+    import sentence_index
+    import tokenizer
+    document_analysis.clear_cache()
+    rendering.clear_cache()
+    sentence_index.clear_cache()
+    tokenizer.clear_cache()
+    incremental.clear_cache()
+
+
+def load_models():
+    """Load the shared models up front so no timing includes model load time"""
+    import resources
+    for name in ('spacy', 'vader', 'stopwords', 'wordnet'):
+        resources.get(name)
+
+
+@contextlib.contextmanager
+def temporary_store(workdir):
+    """Point the shared database and similarity index at workdir while benchmarks run"""
+    import resources
+    from auth import init_db
+    from similarity_index import SimilarityIndex
+    for name in ('db', 'similarity_index'):
+        resources.unload(name)
+    resources.register('db', lambda: init_db(os.path.join(workdir, 'app.db')))
+    resources.register('similarity_index', lambda: SimilarityIndex.load(os.path.join(workdir, 'similarity_index')))
+    try:
+        yield
+    finally:
+        db = resources.unload('db')
+        if db is not None:
+            db.close()
+        resources.unload('similarity_index')
+        resources.register('db', init_db)
+        resources.register('similarity_index', SimilarityIndex.load)
+
+
+def measure(func, memory=True):
+    """(seconds, peak MB) for one cold call of func"""
+    clear_caches()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    peak_mb = None
+    if memory:
+        clear_caches()
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        finally:
+            tracemalloc.stop()
+    return seconds, peak_mb
+
+
+def text_benchmarks(text, other_text, workdir):
+    from text_summarizer import improved_summarize, extract_quality_keywords
+    from sentiment_analyzer import analyze_sentiment
+    from similarity_checker import calculate_similarity
+    from visualizations import generate_wordcloud, generate_frequency_chart
+    from keywords import extract_keywords
+    from tokenizer import tokenize
+    from translator import StubBackend, TranslationMemory, translate_text
+    import text_to_speech
+    from disk_cache import DiskCache
+
+    memory_db = os.path.join(workdir, 'translation_memory.db')
+    tts_root = os.path.join(workdir, 'tts')
+
+    def translate():
+        # A fresh memory each run, otherwise the second run is all cache hits
+        if os.path.exists(memory_db):
+            os.remove(memory_db)
+        translate_text(text, 'fr', backend=StubBackend(), memory=TranslationMemory(memory_db))
+
+    def speak():
+        text_to_speech.tts_cache = DiskCache(tts_root, 1 << 40)
+        text_to_speech.tts_cache.clear()
+        text_to_speech.synthesize_speech(text, 'en', synthesizer=text_to_speech.StubSynthesizer())
+
+    return {
+        'tokenize': lambda: tokenize(text),
+        'improved_summarize': lambda: improved_summarize(text, 100),
+        'extract_quality_keywords': lambda: extract_quality_keywords(text),
+        'keywords_tfidf': lambda: extract_keywords(text, algorithm='tfidf'),
+        'keywords_rake': lambda: extract_keywords(text, algorithm='rake'),
+        'keywords_textrank': lambda: extract_keywords(text, algorithm='textrank'),
+        'analyze_sentiment': lambda: analyze_sentiment(text),
+        'calculate_similarity': lambda: calculate_similarity(text, other_text),
+        'generate_wordcloud': lambda: generate_wordcloud(text),
+        'generate_frequency_chart': lambda: generate_frequency_chart(text),
+        'translate_text_stub': translate,
+        'synthesize_speech_stub': speak,
+    }
+
+
+def file_benchmarks(text, workdir):
+    from file_processor import extract_text, PDF_TYPE, DOCX_TYPE
+
+    pdf_path = os.path.join(workdir, 'doc.pdf')
+    docx_path = os.path.join(workdir, 'doc.docx')
+    write_pdf(pdf_path, text)
+    write_docx(docx_path, text)
+    with open(pdf_path, 'rb') as f:
+        pdf_bytes = f.read()
+    with open(docx_path, 'rb') as f:
+        docx_bytes = f.read()
+    return {
+        'extract_pdf': lambda: extract_text(UploadedFile(pdf_bytes, 'doc.pdf', PDF_TYPE)),
+        'extract_docx': lambda: extract_text(UploadedFile(docx_bytes, 'doc.docx', DOCX_TYPE)),
+    }
+
+
+def run(sizes, only=None, memory=True, file_max_words=DEFAULT_FILE_MAX_WORDS, log=print):
+    load_models()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, temporary_store(workdir):
+        for size in sizes:
+            text = generate_text(size, seed=size)
+            other_text = generate_text(size, seed=size + 1)
+            benchmarks = text_benchmarks(text, other_text, workdir)
+            if size <= file_max_words:
+                benchmarks.update(file_benchmarks(text, workdir))
+            for name, func in benchmarks.items():
+                if only and name not in only:
+                    continue
+                seconds, peak_mb = measure(func, memory)
+                results.setdefault(name, {})[str(size)] = {
+                    'seconds': round(seconds, 4),
+                    'peak_mb': None if peak_mb is None else round(peak_mb, 2),
+                }
+                peak = '' if peak_mb is None else f"  peak {peak_mb:9.1f} MB"
+                log(f"{name:28s} {size:>8d} words  {seconds:9.3f} s{peak}")
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Human-readable regressions: time or peak memory above baseline * tolerance"""
+    regressions = []
+    for name, by_size in results.items():
+        for size, current in by_size.items():
+            previous = baseline.get(name, {}).get(size)
+            if not previous:
+                continue
+            for metric in ('seconds', 'peak_mb'):
+                old, new = previous.get(metric), current.get(metric)
+                # Ignore differences too small to measure reliably
+                if old is None or new is None or new < 0.01:
+                    continue
+                if new > old * tolerance:
+                    regressions.append(f"{name} @ {size} words: {metric} {old} -> {new} ({new / old:.2f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot paths")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="corpus sizes in words")
+    parser.add_argument('--only', nargs='+', help="run only these benchmarks")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--file-max-words', type=int, default=DEFAULT_FILE_MAX_WORDS)
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', help="baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help=f"also write results to {BASELINE_PATH}")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="flag results slower or larger than baseline times this factor")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.only, not args.no_memory, args.file_max_words)
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    paths = [args.output] + ([BASELINE_PATH] if args.save_baseline else [])
+    for path in paths:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"Results written to {', '.join(paths)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""Check the regex tokenizer against NLTK's sent_tokenize and word_tokenize.
+
+Run from the repository root:
+
+    python -m benchmarks.tokenizer_equivalence
+    python -m benchmarks.tokenizer_equivalence --files report.txt notes.txt
+
+Texts are the synthetic benchmark corpus, a set of hand-written cases
+(abbreviations, contractions, quotes, numbers, ellipses) and any files
+given. Sentence boundaries are scored by F1 over sentence end offsets;
+words by how many sentences both tokenizers split identically, and by the
+difference in total token count. Exits with status 1 below the thresholds
+and 2 when NLTK's punkt data is missing.
+"""
+import argparse
+import sys
+
+from benchmarks.corpus import generate_text
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+MIN_SENTENCE_F1 = 0.99
+MIN_WORD_AGREEMENT = 0.98
+MAX_COUNT_ERROR = 0.01
+
+SAMPLES = [
+    "Mr. Smith went to Washington. He arrived on Monday.",
+    "Dr. Jones and Mrs. Brown met at 10:30 a.m. in the U.S. embassy. It went well.",
+    "I can't believe it's not butter! Don't you agree? They'd say we'll see.",
+    "O'Neil's cat isn't here... Wait... where is it? Nobody knows.",
+    'She said "the results were great." Then she left.',
+    "Prices rose 3.2% to $1,000.50 in 2010. The index fell -- sharply -- in Q3.",
+    "The state-of-the-art model (see Fig. 3) is used, e.g. for search, i.e. ranking.",
+    "J. K. Rowling wrote it. J.R.R. Tolkien did too.",
+    "Visit the site at example.com for details. Thanks!",
+    "First paragraph ends here.\n\nSecond paragraph starts here. It has two sentences.",
+]
+
+
+def _normalize(tokens):
+    # Treebank writes double quotes as `` and ''
+    return ['"' if token in ('``', "''") else token for token in tokens]
+
+
+def _locate(text, sentences):
+    """End offsets of each sentence found in text in order"""
+    ends = []
+    position = 0
+    for sentence in sentences:
+        sentence = sentence.strip()
+        found = text.find(sentence, position)
+        if found < 0:
+            continue
+        position = found + len(sentence)
+        ends.append(position)
+    return ends
+
+
+def compare(text, sent_tokenize, word_tokenize):
+    """Agreement counts between the regex tokenizer and the given NLTK functions for one text"""
+    from tokenizer import Tokens
+    tokens = Tokens(text)
+    reference = sent_tokenize(text)
+    reference_ends = set(_locate(text, reference))
+    ends = set(tokens.sent_ends.tolist())
+
+    words = tokens.words()
+    ours = {}
+    for i, (start, end) in enumerate(zip(tokens.sent_starts.tolist(), tokens.sent_ends.tolist())):
+        ours[end] = (start, words[tokens.first_word[i]:tokens.first_word[i + 1]])
+    same_words = compared = reference_words = 0
+    mismatches = []
+    for sentence in reference:
+        theirs = _normalize(word_tokenize(sentence))
+        reference_words += len(theirs)
+        end = _locate(text, [sentence])
+        match = ours.get(end[0]) if end else None
+        if match is None or text[match[0]:end[0]] != sentence.strip():
+            continue
+        compared += 1
+        if match[1] == theirs:
+            same_words += 1
+        elif len(mismatches) < 3:
+            mismatches.append((match[1], theirs))
+    return {
+        'sentences': len(reference),
+        'ends_found': len(ends & reference_ends),
+        'ends_ours': len(ends),
+        'ends_theirs': len(reference_ends),
+        'compared': compared,
+        'same_words': same_words,
+        'words_ours': tokens.num_words,
+        'words_theirs': reference_words,
+        'mismatches': mismatches,
+    }
+
+
+def summarize(name, stats):
+    precision = stats['ends_found'] / stats['ends_ours'] if stats['ends_ours'] else 1.0
+    recall = stats['ends_found'] / stats['ends_theirs'] if stats['ends_theirs'] else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    agreement = stats['same_words'] / stats['compared'] if stats['compared'] else 1.0
+    count_error = abs(stats['words_ours'] - stats['words_theirs']) / max(stats['words_theirs'], 1)
+    print(f"{name:24s} sentences {stats['sentences']:>7d}  boundary F1 {f1:.4f}  "
+          f"same tokens {agreement:.4f}  token count {stats['words_ours']} vs {stats['words_theirs']} "
+          f"({count_error:.2%})")
+    for ours, theirs in stats['mismatches']:
+        print(f"    ours:   {ours}")
+        print(f"    nltk:   {theirs}")
+    return f1, agreement, count_error
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the regex tokenizer with NLTK")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="synthetic corpus sizes in words")
+    parser.add_argument('--files', nargs='*', default=[], help="UTF-8 text files to compare as well")
+    parser.add_argument('--min-sentence-f1', type=float, default=MIN_SENTENCE_F1)
+    parser.add_argument('--min-word-agreement', type=float, default=MIN_WORD_AGREEMENT)
+    parser.add_argument('--max-count-error', type=float, default=MAX_COUNT_ERROR)
+    args = parser.parse_args(argv)
+
+    import resources
+    from nltk.tokenize import sent_tokenize, word_tokenize
+    # Newer NLTK releases read punkt_tab, older ones punkt
+    if not (resources.has_nltk_data('punkt_tab') or resources.has_nltk_data('punkt')
+            or resources.ensure_nltk_data('punkt', 'punkt_tab')):
+        print("NLTK punkt data is not installed and could not be downloaded")
+        return 2
+
+    texts = [(f"corpus {size}", generate_text(size, seed=size)) for size in args.sizes]
+    texts.append(("samples", "\n\n".join(SAMPLES)))
+    for path in args.files:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            texts.append((path, f.read()))
+
+    failed = False
+    for name, text in texts:
+        f1, agreement, count_error = summarize(name, compare(text, sent_tokenize, word_tokenize))
+        if (f1 < args.min_sentence_f1 or agreement < args.min_word_agreement
+                or count_error > args.max_count_error):
+            failed = True
+    print("FAILED: below thresholds" if failed else "OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
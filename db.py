@@ -0,0 +1,124 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = 'app.db'
+POOL_SIZE = 8
+BUSY_TIMEOUT_SECONDS = 10
+# Prepared statements kept per connection (sqlite3's own LRU statement cache)
+STATEMENT_CACHE_SIZE = 256
+BATCH_SIZE = 1000
+
+
+class Database:
+    """Pool of WAL-mode SQLite connections to one database file.
+
+    Connections are handed to one thread at a time, so sessions never share
+    a connection concurrently. Writes run in explicit ``BEGIN IMMEDIATE``
+    transactions and wait up to ``BUSY_TIMEOUT_SECONDS`` for the write lock
+    instead of failing with "database is locked".
+    """
+
+    def __init__(self, path=DB_PATH, pool_size=POOL_SIZE):
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_SECONDS * 1000}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool for the duration of the block"""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.pool_size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                conn = self._pool.get(timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Run the block as one write transaction, committed on success"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchone()
+
+    def iterate(self, sql, params=()):
+        """Stream rows without loading the whole result into memory"""
+        with self.connection() as conn:
+            yield from conn.execute(sql, params)
+
+    def execute(self, sql, params=()):
+        """Run one write statement in its own transaction; returns the cursor"""
+        with self.transaction() as conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql, rows, batch_size=BATCH_SIZE):
+        """Write rows from any iterable, committing once per batch; returns the row count"""
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                with self.transaction() as conn:
+                    conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            with self.transaction() as conn:
+                conn.executemany(sql, batch)
+            count += len(batch)
+        return count
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._created = 0
\ No newline at end of file
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+CACHE_DIR = '.cache'
+
+
+def content_hash(data):
+    """SHA-256 hex digest of bytes or text"""
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    """Content-addressed on-disk cache with size-based LRU eviction.
+
+    Every key (normally a SHA-256 digest) owns a directory holding any number
+    of named artifacts. Reads refresh the directory's mtime, and when the
+    total size goes over ``max_bytes`` the least recently used keys are
+    removed as a whole.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None
+
+    def _entry(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _scan(self):
+        """Total size and (mtime, size, path) of every entry"""
+        entries = []
+        total = 0
+        if os.path.isdir(self.root):
+            for prefix in os.scandir(self.root):
+                if not prefix.is_dir():
+                    continue
+                for entry in os.scandir(prefix.path):
+                    if not entry.is_dir():
+                        continue
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                    entries.append((entry.stat().st_mtime, size, entry.path))
+                    total += size
+        return total, entries
+
+    def get(self, key, name):
+        path = os.path.join(self._entry(key), name)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(self._entry(key))
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, name, data):
+        entry = self._entry(key)
+        os.makedirs(entry, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=entry, prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        path = os.path.join(entry, name)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        os.replace(tmp, path)
+        os.utime(entry)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[0]
+            else:
+                self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        total, entries = self._scan()
+        entries.sort()
+        # Free down to 90% of the budget so eviction doesn't run on every write
+        target = self.max_bytes * 0.9
+        for mtime, size, path in entries:
+            if total <= target:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+        self._size = total
+
+    def get_text(self, key, name):
+        data = self.get(key, name)
+        return None if data is None else data.decode('utf-8', 'surrogatepass')
+
+    def put_text(self, key, name, text):
+        self.put(key, name, text.encode('utf-8', 'surrogatepass'))
+
+    def get_json(self, key, name):
+        data = self.get(key, name)
+        return None if data is None else json.loads(data)
+
+    def put_json(self, key, name, value):
+        self.put(key, name, json.dumps(value).encode('utf-8'))
+
+    def clear(self):
+        with self._lock:
+            shutil.rmtree(self.root, ignore_errors=True)
+            self._size = 0
\ No newline at end of file
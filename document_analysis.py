@@ -0,0 +1,298 @@
+import hashlib
+import re
+import sys
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+from spacy.attrs import LOWER, LEMMA, POS, IS_ALPHA, IS_STOP, IDX
+from spacy.parts_of_speech import IDS as POS_IDS, NAMES as _POS_NAMES
+
+import resources
+import tracing
+from nlp_worker import get_client
+
+# Parsed documents are kept in memory up to this many bytes (least recently used go first)
+CACHE_BUDGET_BYTES = 256 * 1024 * 1024
+
+# Long texts are fed to spaCy in chunks of at most this many characters
+CHUNK_CHARS = 50000
+BATCH_SIZE = 8
+# Texts longer than this are parsed across all cores
+PARALLEL_MIN_CHARS = 200000
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+POS_NAMES = {int(pos_id): name for pos_id, name in _POS_NAMES.items()}
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def text_key(text):
+    """Content hash used to identify a text across pages and reruns"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+class DocumentAnalysis:
+    """Compact, read-only result of parsing a text once with spaCy.
+
+    Token attributes are stored as NumPy arrays of ids into a shared
+    ``vocab`` list instead of keeping the spaCy ``Doc`` alive.
+    ``token_starts`` holds each token's character offset in the text.
+    """
+
+    __slots__ = ("key", "vocab", "text_ids", "lemma_ids", "pos", "is_alpha",
+                 "is_stop", "token_starts", "sent_starts", "sent_ends", "nbytes", "_vocab_lengths")
+
+    def __init__(self, key, vocab, text_ids, lemma_ids, pos, is_alpha, is_stop,
+                 token_starts, sent_starts, sent_ends):
+        self.key = key
+        self.vocab = vocab
+        self.text_ids = text_ids
+        self.lemma_ids = lemma_ids
+        self.pos = pos
+        self.is_alpha = is_alpha
+        self.is_stop = is_stop
+        self.token_starts = token_starts
+        self.sent_starts = sent_starts
+        self.sent_ends = sent_ends
+        self._vocab_lengths = None
+        self.nbytes = (
+            sum(a.nbytes for a in (text_ids, lemma_ids, pos, is_alpha, is_stop, token_starts, sent_starts, sent_ends))
+            + sum(sys.getsizeof(s) for s in vocab)
+        )
+
+    @classmethod
+    def from_parts(cls, parts, key):
+        """Merge per-chunk token arrays (see ``_doc_part``) into one analysis"""
+        if parts:
+            attrs = np.concatenate([part[0] for part in parts])
+            sents = np.concatenate([part[2] for part in parts])
+        else:
+            attrs = np.zeros((0, 6), dtype=np.uint64)
+            sents = np.zeros((0, 2), dtype=np.int64)
+        strings = {}
+        for part in parts:
+            strings.update(part[1])
+        n = len(attrs)
+        hashes, ids = np.unique(np.concatenate([attrs[:, 0], attrs[:, 1]]), return_inverse=True)
+        return cls(
+            key,
+            [strings[int(h)] for h in hashes],
+            ids[:n].astype(np.int32),
+            ids[n:].astype(np.int32),
+            attrs[:, 2].astype(np.uint8),
+            attrs[:, 3].astype(bool),
+            attrs[:, 4].astype(bool),
+            attrs[:, 5].astype(np.int64),
+            sents[:, 0].copy(),
+            sents[:, 1].copy(),
+        )
+
+    def char_span(self, start, end):
+        """Analysis of the tokens starting in text[start:end], as if that span had been parsed alone.
+
+        Arrays and vocab are copies, so it doesn't keep this analysis alive;
+        offsets stay relative to the whole text.
+        """
+        lo, hi = np.searchsorted(self.token_starts, [start, end])
+        first, last = np.searchsorted(self.sent_starts, [start, end])
+        n = hi - lo
+        used, ids = np.unique(np.concatenate([self.text_ids[lo:hi], self.lemma_ids[lo:hi]]), return_inverse=True)
+        span = DocumentAnalysis(
+            None, [self.vocab[i] for i in used.tolist()], ids[:n].astype(np.int32), ids[n:].astype(np.int32),
+            self.pos[lo:hi].copy(), self.is_alpha[lo:hi].copy(), self.is_stop[lo:hi].copy(),
+            self.token_starts[lo:hi].copy(), self.sent_starts[first:last].copy(), self.sent_ends[first:last].copy(),
+        )
+        span._vocab_lengths = self.vocab_lengths()[used]
+        return span
+
+    def __len__(self):
+        return len(self.text_ids)
+
+    @property
+    def num_sentences(self):
+        return len(self.sent_starts)
+
+    def vocab_lengths(self):
+        """Length of every vocab string"""
+        if self._vocab_lengths is None:
+            self._vocab_lengths = np.fromiter((len(s) for s in self.vocab), dtype=np.int32, count=len(self.vocab))
+        return self._vocab_lengths
+
+    def mask(self, pos=None, alpha=None, stop=None, min_length=0):
+        """Boolean token mask for the given POS tags and lexical flags"""
+        mask = np.ones(len(self), dtype=bool)
+        if pos is not None:
+            mask &= np.isin(self.pos, [POS_IDS[tag] for tag in pos])
+        if alpha is not None:
+            mask &= self.is_alpha == alpha
+        if stop is not None:
+            mask &= self.is_stop == stop
+        if min_length:
+            mask &= self.vocab_lengths()[self.text_ids] >= min_length
+        return mask
+
+    def lemma_counts(self, mask=None):
+        """(lowercased lemma, count) pairs in order of first occurrence"""
+        ids = self.lemma_ids if mask is None else self.lemma_ids[mask]
+        if not len(ids):
+            return []
+        uniq, first, counts = np.unique(ids, return_index=True, return_counts=True)
+        merged = {}
+        for i in np.argsort(first, kind="stable"):
+            lemma = self.vocab[uniq[i]].lower()
+            merged[lemma] = merged.get(lemma, 0) + int(counts[i])
+        return list(merged.items())
+
+    def term_counts(self, mask=None):
+        """Counter of (lowercased lemma, POS tag) pairs, counted with one np.unique pass"""
+        lemma_ids = self.lemma_ids if mask is None else self.lemma_ids[mask]
+        pos = self.pos if mask is None else self.pos[mask]
+        keys, counts = np.unique(lemma_ids.astype(np.int64) << 8 | pos, return_counts=True)
+        terms = Counter()
+        for key, n in zip(keys.tolist(), counts.tolist()):
+            terms[(self.vocab[key >> 8].lower(), POS_NAMES[key & 0xFF])] += n
+        return terms
+
+    def form_counts(self, mask=None):
+        """Counter of (lowercased lemma, lowercased token) pairs"""
+        lemma_ids = self.lemma_ids if mask is None else self.lemma_ids[mask]
+        text_ids = self.text_ids if mask is None else self.text_ids[mask]
+        keys, counts = np.unique(lemma_ids.astype(np.int64) * len(self.vocab) + text_ids, return_counts=True)
+        forms = Counter()
+        for key, n in zip(keys.tolist(), counts.tolist()):
+            lemma_id, text_id = divmod(key, len(self.vocab))
+            forms[(self.vocab[lemma_id].lower(), self.vocab[text_id])] += n
+        return forms
+
+
+def _doc_part(doc, offset):
+    """Token attribute array, hash->string table and shifted sentence offsets for one chunk"""
+    attrs = doc.to_array([LOWER, LEMMA, POS, IS_ALPHA, IS_STOP, IDX]).reshape(-1, 6)
+    attrs[:, 5] += offset
+    strings = {int(h): doc.vocab.strings[int(h)] for h in np.unique(attrs[:, :2])}
+    sents = [(offset + sent.start_char, offset + sent.end_char) for sent in doc.sents] if len(doc) else []
+    return attrs, strings, np.array(sents, dtype=np.int64).reshape(-1, 2)
+
+
+def _find_break(text, start, limit):
+    """Best place to end a chunk: a paragraph break, else a sentence end, else whitespace"""
+    window = text[start:limit]
+    for pattern in (_PARAGRAPH_RE, _SENTENCE_END_RE, _WHITESPACE_RE):
+        last = None
+        for last in pattern.finditer(window, len(window) // 2):
+            pass
+        if last is not None:
+            return start + last.end()
+    return limit
+
+
+def split_into_chunks(text, max_chars=CHUNK_CHARS):
+    """Yield (offset, chunk) slices of text no longer than max_chars"""
+    start = 0
+    while len(text) - start > max_chars:
+        end = _find_break(text, start, start + max_chars)
+        yield start, text[start:end]
+        start = end
+    if start < len(text) or not text:
+        yield start, text[start:]
+
+
+def iter_parts(chunks, batch_size=BATCH_SIZE, n_process=1):
+    """Yield ``_doc_part`` arrays for (text, offset) pairs, in order.
+
+    With INSIGHT_NLP_SOCKET set the shared NLP worker does the parsing and
+    this process never loads spaCy.
+    """
+    client = get_client()
+    if client is None:
+        docs = resources.get("spacy").pipe(chunks, as_tuples=True, batch_size=batch_size, n_process=n_process)
+        for doc, offset in docs:
+            yield _doc_part(doc, offset)
+        return
+    batch = []
+    for item in chunks:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from _remote_parts(client, batch)
+            batch = []
+    if batch:
+        yield from _remote_parts(client, batch)
+
+
+def _remote_parts(client, batch):
+    parts = client.parse([text for text, _ in batch])
+    for (attrs, strings, sents), (_, offset) in zip(parts, batch):
+        attrs = attrs.copy()
+        attrs[:, 5] += offset
+        yield attrs, strings, sents + offset
+
+
+def _cache_get(key):
+    with _cache_lock:
+        analysis = _cache.get(key)
+        if analysis is not None:
+            _cache.move_to_end(key)
+    tracing.count("analysis.cache_hit" if analysis is not None else "analysis.cache_miss")
+    return analysis
+
+
+def _cache_put(analysis):
+    global _cache_bytes
+    with _cache_lock:
+        if analysis.key in _cache:
+            return
+        _cache[analysis.key] = analysis
+        _cache_bytes += analysis.nbytes
+        while _cache_bytes > CACHE_BUDGET_BYTES and len(_cache) > 1:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= evicted.nbytes
+
+
+def cached_analysis(text):
+    """The cached DocumentAnalysis of text if it has already been parsed, else None; never parses"""
+    with _cache_lock:
+        return _cache.get(text_key(text))
+
+
+def analyze_pieces(pieces, sep=" ", n_process=1):
+    """Parse text that arrives in pieces (pages, paragraphs) while it is still arriving.
+
+    Returns ``(text, analysis)`` where text is ``sep.join(pieces)``; the
+    analysis is cached under that text, and ``incremental.lexical_profile``
+    slices it (see ``cached_analysis``) instead of parsing the text again.
+    """
+    received = []
+
+    def chunks():
+        offset = 0
+        for piece in pieces:
+            if received:
+                offset += len(sep)
+            received.append(piece)
+            for start, chunk in split_into_chunks(piece):
+                yield chunk, offset + start
+            offset += len(piece)
+
+    # Includes the time spent producing the pieces (e.g. PDF extraction)
+    with tracing.span("spacy.parse_stream"):
+        parts = list(iter_parts(chunks(), 1, n_process))
+    text = sep.join(received)
+    key = text_key(text)
+    analysis = _cache_get(key)
+    if analysis is None:
+        analysis = DocumentAnalysis.from_parts(parts, key)
+        _cache_put(analysis)
+    return text, analysis
+
+
+def clear_cache():
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
\ No newline at end of file
@@ -1,9 +1,93 @@
 import streamlit as st
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
 import pdfplumber
 from docx import Document
 from nltk.tokenize import word_tokenize
 from text_summarizer import extract_quality_keywords, improved_summarize
+from document_analysis import analyze_pieces
+from disk_cache import CACHE_DIR, DiskCache, content_hash
+from history import remember_text
 import pyperclip
+import tracing
+
+PDF_TYPE = "application/pdf"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# PDFs with at least this many pages are extracted in a process pool
+PARALLEL_MIN_PAGES = 32
+PAGES_PER_TASK = 8
+
+# Extracted text, keywords and summaries of uploaded files, keyed by the SHA-256 of the file bytes
+file_cache = DiskCache(os.path.join(CACHE_DIR, 'files'), 512 * 1024 * 1024)
+
+_worker_pdf = None
+
+def _init_pdf_worker(data):
+    # Each worker opens the PDF once and keeps it for all of its page ranges
+    global _worker_pdf
+    _worker_pdf = pdfplumber.open(io.BytesIO(data))
+
+def _extract_page_range(start, stop):
+    return [page.extract_text() or "" for page in _worker_pdf.pages[start:stop]]
+
+def iter_pdf_pages(data, workers=None, progress=None):
+    """Yield the text of each non-empty PDF page, in order, as soon as it is extracted"""
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        total = len(pdf.pages)
+        if total < PARALLEL_MIN_PAGES or workers == 1:
+            for number, page in enumerate(pdf.pages, 1):
+                with tracing.span("pdf.extract_page"):
+                    text = page.extract_text()
+                if progress:
+                    progress(number, total)
+                if text:
+                    yield text
+            return
+    
+    workers = workers or os.cpu_count() or 1
+    ranges = [(start, min(start + PAGES_PER_TASK, total)) for start in range(0, total, PAGES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_pdf_worker, initargs=(data,)) as pool:
+        # Keep a bounded number of ranges in flight so finished pages don't pile up in memory
+        pending = [pool.submit(_extract_page_range, *r) for r in ranges[:workers * 2]]
+        next_range = len(pending)
+        done = 0
+        while pending:
+            # Only the time spent waiting on workers shows up on this thread
+            with tracing.span("pdf.wait_page_range"):
+                texts = pending.pop(0).result()
+            if next_range < len(ranges):
+                pending.append(pool.submit(_extract_page_range, *ranges[next_range]))
+                next_range += 1
+            for text in texts:
+                done += 1
+                if progress:
+                    progress(done, total)
+                if text:
+                    yield text
+
+def iter_docx_paragraphs(file, progress=None):
+    """Yield the text of each non-empty DOCX paragraph"""
+    with tracing.span("docx.parse"):
+        paragraphs = Document(file).paragraphs
+    for number, para in enumerate(paragraphs, 1):
+        if progress:
+            progress(number, len(paragraphs))
+        if para.text:
+            yield para.text
+
+def iter_text(uploaded_file, progress=None):
+    """Stream an uploaded PDF page by page or a DOCX paragraph by paragraph"""
+    if uploaded_file.type == PDF_TYPE:
+        return iter_pdf_pages(uploaded_file.getvalue(), progress=progress)
+    if uploaded_file.type == DOCX_TYPE:
+        return iter_docx_paragraphs(uploaded_file, progress=progress)
+    return iter(())
+
+def extract_text(uploaded_file):
+    """Plain text of an uploaded PDF or DOCX file"""
+    return " ".join(iter_text(uploaded_file))
 
 def file_upload_page():
     st.subheader("File Upload and Analysis")
@@ -11,20 +95,29 @@ def file_upload_page():
     
     if uploaded_file is not None:
         try:
-            text = ""
-            if uploaded_file.type == "application/pdf":
-                with pdfplumber.open(uploaded_file) as pdf:
-                    text = " ".join([page.extract_text() for page in pdf.pages if page.extract_text()])
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                doc = Document(uploaded_file)
-                text = " ".join([para.text for para in doc.paragraphs if para.text])
+            digest = content_hash(uploaded_file.getvalue())
+            text = file_cache.get_text(digest, 'text.txt')
+            tracing.count("file_cache.hit" if text is not None else "file_cache.miss")
+            if text is None:
+                # Pages are parsed for keywords while later pages are still being extracted
+                bar = st.progress(0.0, text="Extracting text...")
+                text, _ = analyze_pieces(iter_text(
+                    uploaded_file,
+                    progress=lambda done, total: bar.progress(done / total, text=f"Extracting text... {done}/{total}")
+                ))
+                bar.empty()
+                file_cache.put_text(digest, 'text.txt', text)
             
             if text.strip():
                 st.session_state.selected_text = text
+                remember_text(text)
                 st.text_area("Extracted Text", text, height=200)
                 
                 # Immediate keyword display without button
-                keywords = extract_quality_keywords(text)
+                keywords = file_cache.get_json(digest, 'keywords.json')
+                if keywords is None:
+                    keywords = extract_quality_keywords(text)
+                    file_cache.put_json(digest, 'keywords.json', keywords)
                 st.markdown("**Keywords**")
                 st.write(", ".join(keywords))
                 
@@ -38,7 +131,11 @@ def file_upload_page():
                 )
                 
                 if st.button("Generate Summary"):
-                    summary, word_count = improved_summarize(text, word_count)
+                    cached = file_cache.get_json(digest, f'summary_{word_count}.json')
+                    if cached is None:
+                        cached = improved_summarize(text, word_count)
+                        file_cache.put_json(digest, f'summary_{word_count}.json', cached)
+                    summary, word_count = cached
                     st.write("Summary:", summary)
                 
                 # Copy functionality
@@ -0,0 +1,154 @@
+import streamlit as st
+import sqlite3
+from disk_cache import content_hash
+
+PAGE_SIZE = 20
+PREVIEW_CHARS = 300
+
+def init_store(conn):
+    """Indexes and the FTS5 search table for the texts table (run inside init_db)"""
+    conn.execute('''CREATE INDEX IF NOT EXISTS idx_texts_user_created
+                    ON texts (username, created_at DESC, id DESC)''')
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(texts)")}
+    if 'content_hash' not in columns:
+        conn.execute("ALTER TABLE texts ADD COLUMN content_hash TEXT")
+        # Hash each user's first copy of a text; later copies keep NULL so the unique index can be built
+        seen = set()
+        hashes = []
+        for text_id, username, text in conn.execute("SELECT id, username, text FROM texts ORDER BY id"):
+            key = (username, content_hash(text))
+            if key not in seen:
+                seen.add(key)
+                hashes.append((key[1], text_id))
+        conn.executemany("UPDATE texts SET content_hash=? WHERE id=?", hashes)
+    # A user saves each text once, however many sessions or processes try
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_texts_user_hash ON texts (username, content_hash)")
+    try:
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name='texts_fts'").fetchone()
+        conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS texts_fts
+                        USING fts5(text, content='texts', content_rowid='id')''')
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search falls back to LIKE
+        return
+    # Keep the external-content index in step with the texts table
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS texts_fts_insert AFTER INSERT ON texts BEGIN
+                        INSERT INTO texts_fts (rowid, text) VALUES (new.id, new.text);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS texts_fts_delete AFTER DELETE ON texts BEGIN
+                        INSERT INTO texts_fts (texts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS texts_fts_update AFTER UPDATE OF text ON texts BEGIN
+                        INSERT INTO texts_fts (texts_fts, rowid, text) VALUES ('delete', old.id, old.text);
+                        INSERT INTO texts_fts (rowid, text) VALUES (new.id, new.text);
+                    END''')
+    if not exists:
+        conn.execute("INSERT INTO texts_fts (texts_fts) VALUES ('rebuild')")
+
+def _get_db():
+    from auth import get_db
+    return get_db()
+
+def has_fts(db):
+    return db.query_one("SELECT 1 FROM sqlite_master WHERE name='texts_fts'") is not None
+
+def save_texts(username, texts):
+    """Bulk-insert texts for a user, skipping any they have already saved; returns the number given"""
+    return _get_db().executemany("INSERT OR IGNORE INTO texts (text, username, content_hash) VALUES (?, ?, ?)",
+                                 ((text, username, content_hash(text)) for text in texts if text and text.strip()))
+
+def save_text(username, text):
+    return save_texts(username, [text])
+
+def remember_text(text):
+    """Save text to the logged-in user's history unless it is already there"""
+    username = st.session_state.get('username')
+    if not username or not text or not text.strip():
+        return
+    # Saves are deduplicated by the database; this only skips the write on reruns
+    saved = st.session_state.setdefault('saved_text_hashes', set())
+    digest = content_hash(text)
+    if digest not in saved:
+        save_text(username, text)
+        saved.add(digest)
+
+def get_text(username, text_id):
+    row = _get_db().query_one("SELECT text FROM texts WHERE id=? AND username=?", (text_id, username))
+    return row[0] if row else None
+
+def list_texts(username, after=None, limit=PAGE_SIZE):
+    """One page of (id, created_at, preview, length), newest first.
+
+    ``after`` is the (created_at, id) of the last row of the previous page;
+    the index on (username, created_at, id) makes every page equally cheap.
+    """
+    sql = f"SELECT id, created_at, substr(text, 1, {PREVIEW_CHARS}), length(text) FROM texts WHERE username=?"
+    params = [username]
+    if after is not None:
+        sql += " AND (created_at, id) < (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return _get_db().query(sql, params)
+
+def _fts_query(query):
+    # Quote every term so user input can't break FTS5 query syntax; terms are ANDed
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+def search_texts(username, query, after=None, limit=PAGE_SIZE):
+    """One page of full-text matches as (id, created_at, snippet, length), newest first.
+
+    ``after`` is the (created_at, id) of the last row of the previous page.
+    """
+    db = _get_db()
+    params = []
+    if has_fts(db):
+        sql = '''SELECT t.id, t.created_at, snippet(texts_fts, 0, '**', '**', '…', 24), length(t.text)
+                  FROM texts_fts JOIN texts t ON t.id = texts_fts.rowid
+                  WHERE texts_fts MATCH ? AND t.username=?'''
+        params.extend([_fts_query(query), username])
+    else:
+        sql = f'''SELECT t.id, t.created_at, substr(t.text, 1, {PREVIEW_CHARS}), length(t.text)
+                  FROM texts t WHERE t.text LIKE ? AND t.username=?'''
+        params.extend([f"%{query}%", username])
+    if after is not None:
+        sql += " AND (t.created_at, t.id) < (?, ?)"
+        params.extend(after)
+    sql += " ORDER BY t.created_at DESC, t.id DESC LIMIT ?"
+    params.append(limit)
+    return db.query(sql, params)
+
+def history_page():
+    st.subheader("Saved Texts")
+    username = st.session_state.username
+    query = st.text_input("Search your saved texts")
+
+    # Keyset pagination: a stack of the last (created_at, id) of every page shown so far
+    if st.session_state.get('history_query') != query:
+        st.session_state.history_query = query
+        st.session_state.history_cursors = [None]
+    cursors = st.session_state.history_cursors
+
+    if query.strip():
+        rows = search_texts(username, query, cursors[-1])
+    else:
+        rows = list_texts(username, cursors[-1])
+
+    if not rows:
+        st.info("No saved texts found." if len(cursors) == 1 else "No more texts.")
+
+    for text_id, created_at, preview, length in rows:
+        with st.expander(f"{created_at} · {length:,} characters"):
+            st.markdown(preview)
+            if st.button("Use this text", key=f"use_{text_id}"):
+                st.session_state.selected_text = get_text(username, text_id)
+                st.success("Text loaded. Pick a page from the sidebar to analyze it.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("Previous"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if len(rows) == PAGE_SIZE and st.button("Next"):
+            cursors.append((rows[-1][1], rows[-1][0]))
+            st.rerun()
\ No newline at end of file
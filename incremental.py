@@ -0,0 +1,328 @@
+"""Incremental re-analysis of edited text.
+
+Text is cut into segments (paragraphs, with long paragraphs split at
+content-chosen sentence ends) and every segment's results are cached by
+content hash. A tracker remembers the segments of the last text it saw and,
+after an edit, analyzes only the segments that changed and patches its
+document-level totals by subtracting removed segments and adding new ones.
+"""
+import os
+import re
+import sys
+import threading
+import zlib
+from collections import Counter, OrderedDict
+
+import numpy as np
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from document_analysis import (CACHE_BUDGET_BYTES, DocumentAnalysis, PARALLEL_MIN_CHARS, cached_analysis,
+                               iter_parts, text_key)
+from tokenizer import sentence_spans
+import tracing
+
+# Long paragraphs end a segment after a sentence whose hash is 0 modulo this,
+# so segments average this many sentences and boundaries survive edits elsewhere
+SENTENCES_PER_SEGMENT = 8
+MAX_SEGMENT_CHARS = 4000
+# Cached segment results of each kind stay within this many bytes
+SEGMENT_CACHE_BYTES = CACHE_BUDGET_BYTES
+# Shortest token counted as a keyword candidate
+TERM_MIN_LENGTH = 3
+BATCH_SIZE = 64
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+_local = threading.local()
+
+
+def segment_spans(text):
+    """(start, end) offsets of the non-empty, stripped segments of text, in order.
+
+    Each paragraph is one or more segments.
+    """
+    spans = []
+    paragraph_start = 0
+    for separator in [*_PARAGRAPH_RE.finditer(text), None]:
+        paragraph_end = separator.start() if separator else len(text)
+        paragraph = text[paragraph_start:paragraph_end]
+        offset = paragraph_start + len(paragraph) - len(paragraph.lstrip())
+        paragraph = paragraph.strip()
+        if separator:
+            paragraph_start = separator.end()
+        if not paragraph:
+            continue
+        if len(paragraph) <= MAX_SEGMENT_CHARS:
+            spans.append((offset, offset + len(paragraph)))
+            continue
+        start = sentence_start = 0
+        for match in _SENTENCE_END_RE.finditer(paragraph):
+            end = match.start()
+            sentence = paragraph[sentence_start:end]
+            sentence_start = match.end()
+            if (end - start >= MAX_SEGMENT_CHARS
+                    or zlib.crc32(sentence.encode("utf-8", "surrogatepass")) % SENTENCES_PER_SEGMENT == 0):
+                spans.append((offset + start, offset + end))
+                start = match.end()
+        if start < len(paragraph):
+            spans.append((offset + start, offset + len(paragraph)))
+    return spans
+
+
+def split_segments(text):
+    """Non-empty, stripped segments of text in order"""
+    return [text[start:end] for start, end in segment_spans(text)]
+
+
+def _counter_nbytes(counts):
+    # The dict plus its keys, each a string or a tuple of strings
+    size = sys.getsizeof(counts)
+    for key in counts:
+        size += sys.getsizeof(key)
+        if isinstance(key, tuple):
+            size += sum(map(sys.getsizeof, key))
+    return size
+
+
+def _subtract(total, counts):
+    for key, n in counts.items():
+        left = total[key] - n
+        if left > 0:
+            total[key] = left
+        else:
+            del total[key]
+
+
+class SegmentKind:
+    """How to analyze a batch of segments and fold the results into totals"""
+
+    def __init__(self, name, budget=SEGMENT_CACHE_BYTES):
+        self.name = name
+        self.budget = budget
+        # key -> (result, size in bytes)
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.lock = threading.Lock()
+
+    def analyze(self, text, spans, **options):
+        """Results for the segments text[start:end] of each (start, end) in spans"""
+        raise NotImplementedError
+
+    def nbytes(self, result):
+        """Approximate memory held by one result"""
+        raise NotImplementedError
+
+    def empty(self):
+        raise NotImplementedError
+
+    def add(self, totals, result):
+        raise NotImplementedError
+
+    def remove(self, totals, result):
+        raise NotImplementedError
+
+    def results(self, text, spans, keys, known, **options):
+        """Result per key, from ``known``, then the cache, then fresh analysis of the rest"""
+        found = {}
+        missing = {}
+        with self.lock:
+            for span, key in zip(spans, keys):
+                if key in found or key in missing:
+                    continue
+                result = known.get(key)
+                if result is None and key in self.cache:
+                    result = self.cache[key][0]
+                    self.cache.move_to_end(key)
+                if result is None:
+                    missing[key] = span
+                else:
+                    found[key] = result
+        tracing.count(f"{self.name}.segments_reused", len(found))
+        tracing.count(f"{self.name}.segments_analyzed", len(missing))
+        if missing:
+            fresh = self.analyze(text, list(missing.values()), **options)
+            found.update(zip(missing, fresh))
+            sizes = [self.nbytes(result) for result in fresh]
+            with self.lock:
+                for key, result, size in zip(missing, fresh, sizes):
+                    if key in self.cache:
+                        self.cache_bytes -= self.cache.pop(key)[1]
+                    self.cache[key] = (result, size)
+                    self.cache_bytes += size
+                while self.cache_bytes > self.budget and self.cache:
+                    self.cache_bytes -= self.cache.popitem(last=False)[1][1]
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.cache_bytes = 0
+
+
+class SentimentSegments(SegmentKind):
+    """Per segment: sentence start and end offsets into the segment, and float32 VADER scores (n, 4)"""
+
+    def analyze(self, text, spans, n_process=1):
+        from sentiment_analyzer import SCORE_KEYS, score_batch
+        segments = [text[start:end] for start, end in spans]
+        with tracing.span("tokenize.sentences"):
+            spans = [sentence_spans(segment) for segment in segments]
+            sentences = [[segment[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+                         for segment, (starts, ends) in zip(segments, spans)]
+        # One batch for all new segments so large first runs can still use a process pool
+        scores = score_batch([s for group in sentences for s in group], n_process)
+        matrix = np.column_stack([scores[key] for key in SCORE_KEYS]) if len(scores['compound']) \
+            else np.zeros((0, len(SCORE_KEYS)))
+        matrix = matrix.astype(np.float32)
+        results = []
+        offset = 0
+        for starts, ends in spans:
+            results.append((starts, ends, matrix[offset:offset + len(starts)]))
+            offset += len(starts)
+        return results
+
+    def nbytes(self, result):
+        return sum(a.nbytes for a in result)
+
+    def empty(self):
+        return {'sum': np.zeros(4), 'count': 0}
+
+    def add(self, totals, result):
+        totals['sum'] += result[2].sum(axis=0, dtype=np.float64)
+        totals['count'] += len(result[0])
+
+    def remove(self, totals, result):
+        totals['sum'] -= result[2].sum(axis=0, dtype=np.float64)
+        totals['count'] -= len(result[0])
+
+
+class LexicalSegments(SegmentKind):
+    """Per segment: keyword candidate counts by (lemma, POS) and (lemma, form), all lemma
+    counts and the segment's DocumentAnalysis.
+
+    A text that is already parsed as a whole (an upload) is sliced into its
+    segments instead of being parsed again.
+    """
+
+    def analyze(self, text, spans, n_process=None):
+        whole = cached_analysis(text)
+        if whole is not None:
+            tracing.count("lexical.segments_sliced", len(spans))
+            return [self._counts(whole.char_span(start, end)) for start, end in spans]
+        if n_process is None:
+            n_process = (os.cpu_count() or 1) if sum(end - start for start, end in spans) >= PARALLEL_MIN_CHARS else 1
+        with tracing.span("spacy.parse_segments"):
+            parts = iter_parts(((text[start:end], start) for start, end in spans), BATCH_SIZE, n_process)
+            return [self._counts(DocumentAnalysis.from_parts([part], None)) for part in parts]
+
+    @staticmethod
+    def _counts(analysis):
+        candidates = analysis.mask(alpha=True, stop=False, min_length=TERM_MIN_LENGTH)
+        return {
+            'analysis': analysis,
+            'terms': analysis.term_counts(candidates),
+            'forms': analysis.form_counts(candidates),
+            'words': Counter(dict(analysis.lemma_counts(analysis.mask(alpha=True, stop=False)))),
+        }
+
+    def nbytes(self, result):
+        return result['analysis'].nbytes + sum(_counter_nbytes(result[name]) for name in ('terms', 'forms', 'words'))
+
+    def empty(self):
+        return {'terms': Counter(), 'forms': Counter(), 'words': Counter()}
+
+    def add(self, totals, result):
+        for name in ('terms', 'forms', 'words'):
+            totals[name].update(result[name])
+
+    def remove(self, totals, result):
+        for name in ('terms', 'forms', 'words'):
+            _subtract(totals[name], result[name])
+
+
+SENTIMENT = SentimentSegments('sentiment')
+LEXICAL = LexicalSegments('lexical')
+
+
+class Profile:
+    """Segment results of one text, in order, their start offsets in the text and document-level totals"""
+
+    __slots__ = ('keys', 'starts', 'results', 'totals')
+
+    def __init__(self, keys, starts, results, totals):
+        self.keys = keys
+        self.starts = starts
+        self.results = results
+        self.totals = totals
+
+    def ordered(self):
+        return [self.results[key] for key in self.keys]
+
+
+class TextTracker:
+    """Keeps the last analyzed text of a session and updates its totals edit by edit.
+
+    Totals are patched in place, so a returned Profile is only valid until the
+    next call for the same kind.
+    """
+
+    def __init__(self):
+        self._profiles = {}
+        self._lock = threading.Lock()
+
+    def profile(self, kind, text, **options):
+        spans = segment_spans(text)
+        keys = [text_key(text[start:end]) for start, end in spans]
+        starts = np.array([start for start, _ in spans], dtype=np.int64)
+        with self._lock:
+            previous = self._profiles.get(kind.name)
+            if previous is not None and previous.keys == keys:
+                # Whitespace between segments may still have changed
+                previous.starts = starts
+                return previous
+            known = previous.results if previous else {}
+            results = kind.results(text, spans, keys, known, **options)
+
+            if previous is None:
+                totals = kind.empty()
+                old = Counter()
+            else:
+                totals = previous.totals
+                old = Counter(previous.keys)
+            new = Counter(keys)
+            for key, n in (old - new).items():
+                for _ in range(n):
+                    kind.remove(totals, previous.results[key])
+            for key, n in (new - old).items():
+                for _ in range(n):
+                    kind.add(totals, results[key])
+
+            profile = self._profiles[kind.name] = Profile(keys, starts, results, totals)
+        return profile
+
+
+def get_tracker():
+    """The current session's tracker; outside a Streamlit script run, one per thread"""
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        return st.session_state.setdefault('text_tracker', TextTracker())
+    tracker = getattr(_local, 'tracker', None)
+    if tracker is None:
+        tracker = _local.tracker = TextTracker()
+    return tracker
+
+
+def sentiment_profile(text, n_process=1):
+    return get_tracker().profile(SENTIMENT, text, n_process=n_process)
+
+
+def lexical_profile(text, n_process=None):
+    return get_tracker().profile(LEXICAL, text, n_process=n_process)
+
+
+def clear_cache():
+    SENTIMENT.clear()
+    LEXICAL.clear()
+    # Outside Streamlit the tracker would otherwise still hold the last text's results
+    _local.__dict__.pop('tracker', None)
\ No newline at end of file
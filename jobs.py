@@ -0,0 +1,291 @@
+import streamlit as st
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from disk_cache import content_hash
+import resources
+
+JOB_WORKERS = 2
+# Jobs waiting or running at once; further submissions are refused until some finish
+MAX_PENDING = 16
+# Progress is written to the database at most this often per job
+PROGRESS_INTERVAL = 0.5
+# Seconds between progress checks of a job shown on a page
+POLL_INTERVAL = 1.0
+ACTIVE = ('queued', 'running')
+# Each process touches its unfinished jobs this often; one left untouched for
+# LEASE_SECONDS is taken to belong to a process that has died
+HEARTBEAT_INTERVAL = 10
+LEASE_SECONDS = 60
+# Finished jobs and their results are deleted this long after they finished
+RETENTION_DAYS = 7
+CLEANUP_INTERVAL = 3600
+
+_operations = {}
+
+class JobCancelled(Exception):
+    pass
+
+class QueueFull(Exception):
+    pass
+
+def init_jobs(conn):
+    """Jobs table (run inside init_db)"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs
+                    (id TEXT PRIMARY KEY,
+                     dedup_key TEXT NOT NULL,
+                     operation TEXT NOT NULL,
+                     params TEXT NOT NULL,
+                     username TEXT,
+                     status TEXT NOT NULL,
+                     progress REAL NOT NULL DEFAULT 0,
+                     error TEXT,
+                     result_type TEXT,
+                     result BLOB,
+                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    if 'owner' not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_dedup ON jobs (dedup_key, created_at DESC)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, updated_at)")
+    reclaim_stale(conn)
+    cleanup_jobs(conn)
+
+def _owner():
+    """host:pid of the process running a job"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _pid_alive(pid):
+    if os.name != 'posix':
+        # No cheap check here; the heartbeat lease decides
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def reclaim_stale(conn):
+    """Fail unfinished jobs whose process is gone; returns how many.
+
+    A job is stale when its owner on this host no longer exists or it has had
+    no heartbeat for LEASE_SECONDS. Inputs only live in the owner's memory, so
+    such work can't be resumed. Jobs of other live processes are left alone.
+    """
+    host = socket.gethostname()
+    stale = []
+    for job_id, owner, age in conn.execute('''SELECT id, owner, (julianday('now') - julianday(updated_at)) * 86400
+                                              FROM jobs WHERE status IN ('queued', 'running')''').fetchall():
+        owner_host, _, pid = (owner or '').rpartition(':')
+        if age > LEASE_SECONDS or (owner_host == host and pid.isdigit() and not _pid_alive(int(pid))):
+            stale.append((job_id,))
+    conn.executemany('''UPDATE jobs SET status='failed', error='Interrupted: its process stopped',
+                        updated_at=CURRENT_TIMESTAMP
+                        WHERE id=? AND status IN ('queued', 'running')''', stale)
+    return len(stale)
+
+def cleanup_jobs(conn):
+    """Delete jobs, with their results, RETENTION_DAYS after they finished; returns how many"""
+    return conn.execute('''DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled')
+                           AND updated_at < datetime('now', ?)''', (f'-{RETENTION_DAYS} days',)).rowcount
+
+def _get_db():
+    from auth import get_db
+    return get_db()
+
+def register_operation(name, func):
+    """Register func(text, report, **params) as a job operation.
+
+    ``report(fraction)`` records progress and raises JobCancelled once the
+    job has been cancelled, so long operations should call it regularly.
+    Results must be JSON-serializable or bytes.
+    """
+    _operations[name] = func
+
+def job_key(operation, text, params):
+    """Identical work gets the same key: (operation, input hash, parameters)"""
+    return content_hash(f"{operation}\0{content_hash(text)}\0{json.dumps(params, sort_keys=True)}")
+
+def _encode(result):
+    if isinstance(result, bytes):
+        return 'bytes', result
+    return 'json', json.dumps(result)
+
+def _decode(result_type, result):
+    if result_type == 'bytes':
+        return bytes(result)
+    return json.loads(result) if result is not None else None
+
+class JobManager:
+    """Runs operations on a bounded thread pool and keeps their state in the jobs table"""
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=MAX_PENDING):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._cancelled = {}
+        threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True).start()
+
+    def _heartbeat(self):
+        """Keep this process's unfinished jobs fresh; now and then reclaim dead ones and expire old ones"""
+        last_cleanup = time.monotonic()
+        while True:
+            time.sleep(HEARTBEAT_INTERVAL)
+            try:
+                with self._lock:
+                    job_ids = [(job_id,) for job_id in self._futures]
+                db = _get_db()
+                if job_ids:
+                    db.executemany('''UPDATE jobs SET updated_at=CURRENT_TIMESTAMP
+                                      WHERE id=? AND status IN ('queued', 'running')''', job_ids)
+                if time.monotonic() - last_cleanup >= CLEANUP_INTERVAL:
+                    last_cleanup = time.monotonic()
+                    with db.transaction() as conn:
+                        reclaim_stale(conn)
+                        cleanup_jobs(conn)
+            except Exception:
+                # Tried again on the next beat
+                pass
+
+    def submit(self, operation, text, params=None, username=None):
+        """Queue a job and return its id, or the id of an identical queued, running or finished job"""
+        if operation not in _operations:
+            raise ValueError(f"Unknown operation: {operation}")
+        params = params or {}
+        key = job_key(operation, text, params)
+        db = _get_db()
+        with self._lock:
+            # A dead process's job must not absorb new submissions
+            with db.transaction() as conn:
+                reclaim_stale(conn)
+            row = db.query_one('''SELECT id FROM jobs WHERE dedup_key=? AND status IN ('queued', 'running', 'done')
+                                  ORDER BY created_at DESC LIMIT 1''', (key,))
+            if row:
+                return row[0]
+            if len(self._futures) >= self.max_pending:
+                raise QueueFull("Too many jobs are waiting; try again when some have finished")
+            job_id = uuid.uuid4().hex
+            db.execute('''INSERT INTO jobs (id, dedup_key, operation, params, username, status, owner)
+                          VALUES (?, ?, ?, ?, ?, 'queued', ?)''',
+                       (job_id, key, operation, json.dumps(params), username, _owner()))
+            self._cancelled[job_id] = threading.Event()
+            self._futures[job_id] = self._pool.submit(self._run, job_id, operation, text, params)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name}=?" for name in fields)
+        _get_db().execute(f"UPDATE jobs SET {columns}, updated_at=CURRENT_TIMESTAMP WHERE id=?",
+                          (*fields.values(), job_id))
+
+    def _run(self, job_id, operation, text, params):
+        cancelled = self._cancelled[job_id]
+        last_write = [0.0]
+
+        def report(fraction):
+            if cancelled.is_set():
+                raise JobCancelled()
+            now = time.monotonic()
+            if now - last_write[0] >= PROGRESS_INTERVAL:
+                last_write[0] = now
+                self._update(job_id, progress=min(max(float(fraction), 0.0), 1.0))
+
+        try:
+            report(0.0)
+            self._update(job_id, status='running')
+            result = _operations[operation](text, report, **params)
+            if cancelled.is_set():
+                raise JobCancelled()
+            result_type, result = _encode(result)
+            self._update(job_id, status='done', progress=1.0, result_type=result_type, result=result)
+        except JobCancelled:
+            self._update(job_id, status='cancelled')
+        except Exception as e:
+            self._update(job_id, status='failed', error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                self._futures.pop(job_id, None)
+                self._cancelled.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Cancel a queued job at once, or a running one at its next progress report"""
+        with self._lock:
+            event = self._cancelled.get(job_id)
+            future = self._futures.get(job_id)
+            if event is None:
+                return False
+            event.set()
+            if future.cancel():
+                self._futures.pop(job_id, None)
+                self._cancelled.pop(job_id, None)
+                self._update(job_id, status='cancelled')
+        return True
+
+    def get(self, job_id):
+        """Job state as a dict; 'result' is only filled in once the job is done"""
+        row = _get_db().query_one('''SELECT id, operation, params, status, progress, error, result_type,
+                                            CASE WHEN status='done' THEN result END
+                                     FROM jobs WHERE id=?''', (job_id,))
+        if row is None:
+            return None
+        return {
+            'id': row[0],
+            'operation': row[1],
+            'params': json.loads(row[2]),
+            'status': row[3],
+            'progress': row[4],
+            'error': row[5],
+            'result': _decode(row[6], row[7]) if row[3] == 'done' else None,
+        }
+
+resources.register('jobs', JobManager)
+
+def get_jobs():
+    return resources.get('jobs')
+
+def submit_job(operation, text, params=None):
+    """Submit from a page on behalf of the logged-in user; shows a warning if the queue is full"""
+    try:
+        return get_jobs().submit(operation, text, params, st.session_state.get('username'))
+    except QueueFull as e:
+        st.warning(str(e))
+        return None
+
+@st.fragment(run_every=POLL_INTERVAL)
+def _job_progress(job_id, while_active):
+    """Progress bar and Cancel button; reruns on its own every POLL_INTERVAL seconds"""
+    job = get_jobs().get(job_id)
+    if job is None or job['status'] not in ACTIVE:
+        # Finished: rerun the whole page so it can show the result
+        st.rerun()
+    st.progress(job['progress'], text=f"{job['status'].capitalize()}... {job['progress']:.0%}")
+    if st.button("Cancel", key=f"cancel_{job_id}"):
+        get_jobs().cancel(job_id)
+        st.rerun()
+    if while_active is not None:
+        while_active(job)
+
+def job_panel(job_id, while_active=None):
+    """Progress with a Cancel button for an unfinished job; returns the job.
+
+    Nothing here waits for the job: only the progress fragment polls, and the
+    page reruns once the job has finished. ``while_active(job)`` is called on
+    every poll, for anything the page shows while the job runs.
+    """
+    job = get_jobs().get(job_id) if job_id else None
+    if job is None:
+        return None
+    if job['status'] in ACTIVE:
+        _job_progress(job_id, while_active)
+    elif job['status'] == 'failed':
+        st.error(f"Job failed: {job['error']}")
+    elif job['status'] == 'cancelled':
+        st.info("Job cancelled.")
+    return job
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""Keyword extraction shared by the summarizer and the visualizations.
+
+Candidates are lemmas of content words: alphabetic, at least three
+characters, not an NLTK or spaCy stopword and tagged with one of the
+requested parts of speech. Every ranking works on integer arrays from the
+segment analyses of the text's lexical profile (the one spaCy parse), so
+after parsing extraction is a few NumPy passes:
+
+- ``frequency``: how often the lemma occurs (kept up to date edit by edit)
+- ``tfidf``: frequency weighted by IDF over the saved texts, so words that
+  every saved text uses rank lower
+- ``rake``: RAKE word degree; candidate runs between stopwords and
+  punctuation are phrases and a word scores the total length of the
+  phrases it appears in
+- ``textrank``: PageRank over a co-occurrence graph of nearby candidates
+"""
+import heapq
+
+import numpy as np
+from scipy import sparse
+
+from document_analysis import POS_IDS
+from incremental import lexical_profile, TERM_MIN_LENGTH
+import resources
+import tracing
+
+ALGORITHMS = ('frequency', 'tfidf', 'rake', 'textrank')
+DEFAULT_ALGORITHM = 'frequency'
+KEYWORD_POS = ('NOUN', 'PROPN', 'ADJ', 'VERB')
+TEXTRANK_WINDOW = 4
+TEXTRANK_DAMPING = 0.85
+TEXTRANK_TOLERANCE = 1e-6
+TEXTRANK_ITERATIONS = 50
+
+
+def _is_candidate(lemma, stop_words):
+    return len(lemma) >= TERM_MIN_LENGTH and lemma not in stop_words
+
+
+# Each scorer returns {lemma: score} and a Counter of (lemma, form) pairs
+
+def _frequency_scores(text, pos):
+    stop_words = resources.get('stopwords')
+    totals = lexical_profile(text).totals
+    counts = {}
+    for (lemma, tag), n in totals['terms'].items():
+        if tag in pos and _is_candidate(lemma, stop_words):
+            counts[lemma] = counts.get(lemma, 0) + n
+    return counts, totals['forms']
+
+
+def _tfidf_scores(text, pos):
+    from auth import get_db
+    from similarity_index import get_index
+    counts, forms = _frequency_scores(text, pos)
+    index = get_index()
+    # Texts may have been saved since this process loaded the index
+    index.sync_from_db(get_db())
+    # The index holds written words, not lemmas: a lemma's IDF is the mean over its forms in the text
+    written = {}
+    for (lemma, form), n in forms.items():
+        if lemma in counts:
+            written.setdefault(lemma, {})[form] = n
+    words = sorted({form for lemma_forms in written.values() for form in lemma_forms})
+    idf = dict(zip(words, index.idf(words).tolist()))
+    scores = {}
+    for lemma, n in counts.items():
+        lemma_forms = written.get(lemma)
+        if lemma_forms:
+            weight = sum(idf[form] * k for form, k in lemma_forms.items()) / sum(lemma_forms.values())
+        else:
+            weight = index.idf([lemma])[0]
+        scores[lemma] = n * weight
+    return scores, forms
+
+
+def _candidate_sequence(text, pos):
+    """Lowercased lemma ids of every token, the vocabulary, candidate mask and candidate forms"""
+    profile = lexical_profile(text)
+    stop_words = resources.get('stopwords')
+    ids = {}
+    vocab = []
+
+    def shared_id(word):
+        word = word.lower()
+        if not _is_candidate(word, stop_words):
+            return -1
+        if word not in ids:
+            ids[word] = len(vocab)
+            vocab.append(word)
+        return ids[word]
+
+    # Segments sliced from one parse share its vocab, so usually this maps one vocab
+    mappings = {}
+    sequences = [np.zeros(0, dtype=np.int64)]
+    tags = [np.zeros(0, dtype=np.uint8)]
+    for result in profile.ordered():
+        analysis = result['analysis']
+        mapping = mappings.get(id(analysis.vocab))
+        if mapping is None:
+            mapping = mappings[id(analysis.vocab)] = np.fromiter(
+                map(shared_id, analysis.vocab), dtype=np.int64, count=len(analysis.vocab))
+        sequence = mapping[analysis.lemma_ids]
+        sequence[~analysis.mask(alpha=True, stop=False, min_length=TERM_MIN_LENGTH)] = -1
+        sequences.append(sequence)
+        tags.append(analysis.pos)
+    # The POS test is one pass over the whole text rather than one per segment
+    lemma_ids = np.concatenate(sequences)
+    mask = (lemma_ids >= 0) & np.isin(np.concatenate(tags), [POS_IDS[tag] for tag in pos])
+    return lemma_ids, vocab, mask, profile.totals['forms']
+
+
+def _rake_scores(text, pos):
+    lemma_ids, vocab, mask, forms = _candidate_sequence(text, pos)
+    if not mask.any():
+        return {}, forms
+    # Each maximal run of candidate tokens is a phrase
+    starts = mask & ~np.concatenate([[False], mask[:-1]])
+    run_ids = np.cumsum(starts)[mask] - 1
+    run_lengths = np.bincount(run_ids)
+    degree = np.bincount(lemma_ids[mask], weights=run_lengths[run_ids], minlength=len(vocab))
+    return {vocab[i]: float(degree[i]) for i in np.flatnonzero(degree)}, forms
+
+
+def _textrank_scores(text, pos):
+    lemma_ids, vocab, mask, forms = _candidate_sequence(text, pos)
+    sequence = lemma_ids[mask]
+    nodes, sequence = np.unique(sequence, return_inverse=True)
+    n = len(nodes)
+    if n < 2:
+        return {vocab[i]: 1.0 for i in nodes}, forms
+    rows = np.concatenate([sequence[:-k] for k in range(1, TEXTRANK_WINDOW) if k < len(sequence)])
+    cols = np.concatenate([sequence[k:] for k in range(1, TEXTRANK_WINDOW) if k < len(sequence)])
+    keep = rows != cols
+    # Edge weight = how often the two lemmas co-occur; merged before building the matrix
+    pairs = np.concatenate([rows[keep] * n + cols[keep], cols[keep] * n + rows[keep]])
+    pairs, weights = np.unique(pairs, return_counts=True)
+    graph = sparse.csr_matrix((weights.astype(np.float64), (pairs // n, pairs % n)), shape=(n, n))
+    out_weight = np.asarray(graph.sum(axis=1)).ravel()
+    out_weight[out_weight == 0] = 1
+    transition = (sparse.diags(1 / out_weight) @ graph).T.tocsr()
+    rank = np.full(n, 1 / n)
+    for _ in range(TEXTRANK_ITERATIONS):
+        updated = (1 - TEXTRANK_DAMPING) / n + TEXTRANK_DAMPING * (transition @ rank)
+        done = np.abs(updated - rank).sum() < TEXTRANK_TOLERANCE
+        rank = updated
+        if done:
+            break
+    return {vocab[i]: float(r) for i, r in zip(nodes.tolist(), rank)}, forms
+
+
+_SCORERS = {
+    'frequency': _frequency_scores,
+    'tfidf': _tfidf_scores,
+    'rake': _rake_scores,
+    'textrank': _textrank_scores,
+}
+
+
+def _best_forms(forms, lemmas):
+    """Most frequent written form of each lemma; ties go to the alphabetically first form.
+
+    Counter order depends on the edit history, so it must not decide ties.
+    """
+    best = {}
+    for (lemma, form), n in forms.items():
+        if lemma in lemmas and (-n, form) < best.get(lemma, (0, ''))[:2]:
+            best[lemma] = (-n, form)
+    return {lemma: form for lemma, (_, form) in best.items()}
+
+
+@tracing.traced("keywords.extract")
+def extract_keywords(text, top_n=20, algorithm=DEFAULT_ALGORITHM, pos=KEYWORD_POS):
+    """Top (lemma, form, score) triples, best first; form is the lemma's most frequent word form in the text"""
+    if algorithm not in _SCORERS:
+        raise ValueError(f"Unknown keyword algorithm: {algorithm}")
+    for tag in pos:
+        if tag not in POS_IDS:
+            raise ValueError(f"Unknown part of speech: {tag}")
+    scores, forms = _SCORERS[algorithm](text, pos)
+    top = heapq.nsmallest(top_n, scores.items(), key=lambda x: (-x[1], x[0]))
+    forms = _best_forms(forms, {lemma for lemma, _ in top})
+    return [(lemma, forms.get(lemma, lemma), score) for lemma, score in top]
\ No newline at end of file
@@ -0,0 +1,194 @@
+import random
+import re
+import time
+import zlib
+
+import numpy as np
+
+NUM_PERM = 128
+SHINGLE_SIZE = 5
+DEFAULT_THRESHOLD = 0.8
+# Shingles are hashed against the permutations in blocks to bound memory
+_BLOCK = 4096
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """Unique 32-bit hashes of the word k-grams in text"""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.zeros(0, dtype=np.uint64)
+    grams = (' '.join(words[i:i + k]) for i in range(max(1, len(words) - k + 1)))
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64))
+
+
+def optimal_bands(threshold, num_perm=NUM_PERM):
+    """(bands, rows) whose LSH S-curve crosses 50% closest to the Jaccard threshold"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class NearDuplicateDetector:
+    """Streaming MinHash + LSH banding near-duplicate finder.
+
+    Documents are added one at a time; signatures are kept in one uint32
+    array (``num_perm`` values per document) and only documents that share
+    an LSH bucket are ever compared, so the work is sub-quadratic.
+    """
+
+    def __init__(self, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.doc_ids = []
+        self.signatures = np.zeros((64, num_perm), dtype=np.uint32)
+        self._buckets = {}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def signature(self, text):
+        hashes = shingle_hashes(text, self.shingle_size)
+        signature = np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), _BLOCK):
+            block = hashes[start:start + _BLOCK, None]
+            permuted = ((block * self._a + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+            np.minimum(signature, permuted.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+    def add(self, doc_id, text):
+        self.add_signature(doc_id, self.signature(text))
+
+    def add_signature(self, doc_id, signature):
+        """Add a signature computed elsewhere by a detector with the same num_perm and seed"""
+        row = len(self.doc_ids)
+        if row == len(self.signatures):
+            self.signatures = np.concatenate([self.signatures, np.zeros_like(self.signatures)])
+        signature = np.asarray(signature, dtype=np.uint32)
+        self.signatures[row] = signature
+        self.doc_ids.append(doc_id)
+        for band in range(self.bands):
+            key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            self._buckets.setdefault(key, []).append(row)
+
+    def add_many(self, docs):
+        """Add (doc_id, text) pairs from any iterable, e.g. a database cursor"""
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+        return self
+
+    def estimated_jaccard(self, i, j):
+        return float(np.mean(self.signatures[i] == self.signatures[j]))
+
+    def candidate_pairs(self):
+        pairs = set()
+        for members in self._buckets.values():
+            if len(members) > 1:
+                for x in range(len(members)):
+                    for y in range(x + 1, len(members)):
+                        pairs.add((members[x], members[y]))
+        return pairs
+
+    def clusters(self):
+        """Groups of doc ids whose estimated Jaccard similarity reaches the threshold"""
+        parent = list(range(len(self.doc_ids)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i, j in self.candidate_pairs():
+            if self.estimated_jaccard(i, j) >= self.threshold:
+                parent[find(i)] = find(j)
+
+        groups = {}
+        for i in range(len(self.doc_ids)):
+            groups.setdefault(find(i), []).append(self.doc_ids[i])
+        return [group for group in groups.values() if len(group) > 1]
+
+
+def find_near_duplicates(docs, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM):
+    """Clusters of near-duplicate doc ids among (doc_id, text) pairs"""
+    return NearDuplicateDetector(threshold, num_perm).add_many(docs).clusters()
+
+
+def synthetic_corpus(n_docs=2000, words_per_doc=200, duplicate_rate=0.2, edit_rate=0.01, seed=0):
+    """Random documents plus lightly edited copies; returns (docs, planted pairs)"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    originals = [[rng.choice(vocabulary) for _ in range(words_per_doc)]
+                 for _ in range(int(n_docs * (1 - duplicate_rate)))]
+    docs = [' '.join(words) for words in originals]
+    planted = set()
+    while len(docs) < n_docs:
+        source = rng.randrange(len(originals))
+        words = list(originals[source])
+        for _ in range(int(len(words) * edit_rate)):
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+        planted.add((source, len(docs)))
+        docs.append(' '.join(words))
+    return docs, planted
+
+
+def benchmark(n_docs=2000, threshold=DEFAULT_THRESHOLD, pair_sample=200):
+    """Compare MinHash/LSH against exact TF-IDF cosine on a synthetic corpus"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
+    from similarity_checker import calculate_similarity
+
+    docs, planted = synthetic_corpus(n_docs)
+
+    def recall(clusters):
+        found = set()
+        for group in clusters:
+            found.update((a, b) for a in group for b in group if a < b)
+        return len(planted & found) / len(planted) if planted else 1.0
+
+    start = time.perf_counter()
+    lsh_clusters = find_near_duplicates(enumerate(docs), threshold)
+    lsh_seconds = time.perf_counter() - start
+
+    # Exact baseline: one TF-IDF fit and a full cosine matrix (the cheapest exact approach)
+    start = time.perf_counter()
+    matrix = TfidfVectorizer(stop_words='english').fit_transform(docs)
+    sims = cosine_similarity(matrix)
+    exact_pairs = {(int(i), int(j)) for i, j in np.argwhere(np.triu(sims >= threshold, 1))}
+    exact_seconds = time.perf_counter() - start
+
+    # The page's pairwise calculate_similarity refits per pair; extrapolate from a sample
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(pair_sample):
+        calculate_similarity(docs[rng.randrange(n_docs)], docs[rng.randrange(n_docs)])
+    per_pair = (time.perf_counter() - start) / pair_sample
+    all_pairs = n_docs * (n_docs - 1) // 2
+
+    return {
+        'documents': n_docs,
+        'planted_pairs': len(planted),
+        'lsh_seconds': round(lsh_seconds, 3),
+        'lsh_clusters': len(lsh_clusters),
+        'lsh_recall': round(recall(lsh_clusters), 3),
+        'exact_matrix_seconds': round(exact_seconds, 3),
+        'exact_pairs': len(exact_pairs),
+        'exact_recall': round(len(planted & exact_pairs) / len(planted), 3) if planted else 1.0,
+        'pairwise_refit_estimated_seconds': round(per_pair * all_pairs, 1),
+    }
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(benchmark(), indent=2))
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""Shared NLP worker: one process holding spaCy and VADER for every app process.
+
+Start it once per machine:
+
+    python nlp_worker.py --socket /tmp/insight-nlp.sock
+
+and run each Streamlit server with INSIGHT_NLP_SOCKET=/tmp/insight-nlp.sock.
+Requests arriving from different sessions within a few milliseconds of each
+other are merged into one ``nlp.pipe`` or VADER batch. Results travel as
+compact NumPy arrays (the same token arrays DocumentAnalysis keeps), never
+as pickles, so a client can't make the worker run code.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import resources
+
+SOCKET_ENV = "INSIGHT_NLP_SOCKET"
+# A batch is sent to the model when it holds this many texts or the oldest request has waited this long
+PARSE_BATCH_TEXTS = 32
+VADER_BATCH_TEXTS = 4096
+MAX_WAIT_SECONDS = 0.005
+# Texts per request sent by the client, so one large document can't monopolize a batch
+CLIENT_PARSE_TEXTS = 8
+CLIENT_VADER_TEXTS = 2000
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+# A client gives up on a request after this long and uses its local models for RETRY_SECONDS
+REQUEST_TIMEOUT_SECONDS = 30
+RETRY_SECONDS = 60
+
+_FRAME = struct.Struct("!II")
+
+
+def pack(header, arrays=()):
+    """Frame = lengths + JSON header (with array dtypes and shapes) + raw array bytes"""
+    arrays = [np.ascontiguousarray(a) for a in arrays]
+    header = dict(header, arrays=[(a.dtype.str, a.shape) for a in arrays])
+    head = json.dumps(header).encode("utf-8")
+    body = b"".join(a.tobytes() for a in arrays)
+    return _FRAME.pack(len(head), len(body)) + head + body
+
+
+def unpack(head, body):
+    header = json.loads(head)
+    arrays = []
+    offset = 0
+    for dtype, shape in header.pop("arrays", ()):
+        dtype = np.dtype(dtype)
+        count = int(np.prod(shape))
+        arrays.append(np.frombuffer(body, dtype=dtype, count=count, offset=offset).reshape(shape))
+        offset += count * dtype.itemsize
+    return header, arrays
+
+
+def _encode_parts(parts):
+    """Header and arrays for a list of (attrs, strings, sents) parts"""
+    header = {"strings": [[list(strings), list(strings.values())] for _, strings, _ in parts]}
+    arrays = [a for attrs, _, sents in parts for a in (attrs, sents)]
+    return header, arrays
+
+
+def _decode_parts(header, arrays):
+    return [
+        (arrays[2 * i], dict(zip(hashes, values)), arrays[2 * i + 1])
+        for i, (hashes, values) in enumerate(header["strings"])
+    ]
+
+
+# --- server -----------------------------------------------------------------
+
+class MicroBatcher:
+    """Merges concurrent requests into batches for a function that is run on one thread"""
+
+    def __init__(self, run_batch, max_texts, max_wait=MAX_WAIT_SECONDS):
+        self.run_batch = run_batch
+        self.max_texts = max_texts
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        # One thread per model: it is never called concurrently
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    async def submit(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_texts:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+                size += len(batch[-1][0])
+            texts = [text for texts, _ in batch for text in texts]
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            start = 0
+            for texts, future in batch:
+                if not future.done():
+                    future.set_result(results[start:start + len(texts)])
+                start += len(texts)
+
+
+def _parse_batch(texts):
+    from document_analysis import BATCH_SIZE, _doc_part
+    nlp = resources.get("spacy")
+    return [_doc_part(doc, 0) for doc in nlp.pipe(texts, batch_size=BATCH_SIZE)]
+
+
+def _vader_batch(texts):
+    from sentiment_analyzer import _score_chunk
+    return _score_chunk(texts)
+
+
+async def serve(path):
+    batchers = {
+        "parse": MicroBatcher(_parse_batch, PARSE_BATCH_TEXTS),
+        "vader": MicroBatcher(_vader_batch, VADER_BATCH_TEXTS),
+    }
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                try:
+                    head_len, body_len = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+                except asyncio.IncompleteReadError:
+                    break
+                if head_len + body_len > MAX_FRAME_BYTES:
+                    break
+                header, _ = unpack(await reader.readexactly(head_len), await reader.readexactly(body_len))
+                op = header.get("op")
+                try:
+                    if op == "parse":
+                        response = pack(*_encode_parts(await batchers["parse"].submit(header["texts"])))
+                    elif op == "vader":
+                        scores = await batchers["vader"].submit(header["texts"])
+                        response = pack({}, [np.asarray(scores, dtype=np.float64).reshape(-1, 4)])
+                    elif op == "ping":
+                        response = pack({"ok": True})
+                    else:
+                        response = pack({"error": f"Unknown operation: {op}"})
+                except Exception as e:
+                    response = pack({"error": f"{type(e).__name__}: {e}"})
+                writer.write(response)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    # Only processes of the same user may connect: the socket is created 0600
+    # rather than narrowed after it is already accepting connections
+    umask = os.umask(0o177)
+    try:
+        server = await asyncio.start_unix_server(handle, path=path)
+    finally:
+        os.umask(umask)
+    # Keep references: the event loop only holds tasks weakly
+    tasks = [asyncio.create_task(batcher.run()) for batcher in batchers.values()]
+    print(f"NLP worker listening on {path}", file=sys.stderr)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve spaCy parsing and VADER scoring over a Unix socket")
+    parser.add_argument("--socket", default=os.environ.get(SOCKET_ENV, "/tmp/insight-nlp.sock"))
+    args = parser.parse_args(argv)
+    # The worker itself always uses its local models
+    os.environ.pop(SOCKET_ENV, None)
+    for name in ("spacy", "vader"):
+        resources.get(name)
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+# --- client -----------------------------------------------------------------
+
+class NLPClient:
+    """Blocking client; each thread (Streamlit session) keeps its own connection.
+
+    When the worker times out or can't be reached, requests are served by the
+    local models and the worker is skipped for RETRY_SECONDS.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._retry_at = 0.0
+
+    def available(self):
+        return time.monotonic() >= self._retry_at
+
+    def _fall_back(self, error):
+        self._retry_at = time.monotonic() + RETRY_SECONDS
+        print(f"NLP worker at {self.path} failed ({error}); using local models for {RETRY_SECONDS} s",
+              file=sys.stderr)
+
+    def _socket(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(REQUEST_TIMEOUT_SECONDS)
+            sock.connect(self.path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    @staticmethod
+    def _recv(sock, n):
+        data = bytearray()
+        while len(data) < n:
+            chunk = sock.recv(min(n - len(data), 1 << 20))
+            if not chunk:
+                raise ConnectionError("NLP worker closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def call(self, header, arrays=()):
+        frame = pack(header, arrays)
+        for attempt in range(2):
+            try:
+                sock = self._socket()
+                sock.sendall(frame)
+                head_len, body_len = _FRAME.unpack(self._recv(sock, _FRAME.size))
+                response, arrays = unpack(self._recv(sock, head_len), self._recv(sock, body_len))
+                break
+            except TimeoutError:
+                # A late reply would be read as the answer to the next request
+                self._close()
+                raise
+            except OSError:
+                # A worker restart drops connections: reconnect once
+                self._close()
+                if attempt:
+                    raise
+        if "error" in response:
+            raise RuntimeError(f"NLP worker: {response['error']}")
+        return response, arrays
+
+    def ping(self):
+        return self.call({"op": "ping"})[0].get("ok", False)
+
+    def parse(self, texts):
+        """(attrs, strings, sents) per text, like document_analysis._doc_part(doc, 0)"""
+        texts = list(texts)
+        if self.available():
+            try:
+                parts = []
+                for start in range(0, len(texts), CLIENT_PARSE_TEXTS):
+                    parts.extend(_decode_parts(*self.call({"op": "parse",
+                                                           "texts": texts[start:start + CLIENT_PARSE_TEXTS]})))
+                return parts
+            except OSError as e:
+                self._fall_back(e)
+        return _parse_batch(texts)
+
+    def polarity_scores(self, texts):
+        """(n, 4) array of compound, pos, neg, neu scores"""
+        texts = list(texts)
+        if self.available():
+            try:
+                chunks = [self.call({"op": "vader", "texts": texts[start:start + CLIENT_VADER_TEXTS]})[1][0]
+                          for start in range(0, len(texts), CLIENT_VADER_TEXTS)]
+                return np.concatenate(chunks) if chunks else np.zeros((0, 4))
+            except OSError as e:
+                self._fall_back(e)
+        return _vader_batch(texts)
+
+
+def _connect():
+    path = os.environ.get(SOCKET_ENV)
+    if not path:
+        return None
+    client = NLPClient(path)
+    try:
+        client.ping()
+    except OSError as e:
+        print(f"NLP worker at {path} unavailable ({e}); using local models", file=sys.stderr)
+        return None
+    return client
+
+
+resources.register("nlp_client", _connect)
+
+
+def get_client():
+    """Client for the shared worker, or None to use in-process models"""
+    if not os.environ.get(SOCKET_ENV):
+        return None
+    client = resources.get("nlp_client")
+    return client if client is not None and client.available() else None
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
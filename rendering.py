@@ -0,0 +1,83 @@
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from wordcloud import WordCloud
+
+import tracing
+
+# Rendered PNGs kept in memory, keyed by (chart type, data, parameters)
+RENDER_CACHE_SIZE = 64
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _render_cached(key, render, *args):
+    """Render in the calling thread unless an identical render is cached"""
+    with _cache_lock:
+        png = _cache.get(key)
+        if png is not None:
+            _cache.move_to_end(key)
+    tracing.count("render.cache_hit" if png is not None else "render.cache_miss")
+    if png is not None:
+        return png
+    # Failed renders are not cached, so the next call tries again
+    png = render(*args)
+    with _cache_lock:
+        _cache[key] = png
+        while len(_cache) > RENDER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return png
+
+
+@tracing.traced("render.wordcloud")
+def _wordcloud_png(keywords, width, height, background_color, prefer_horizontal):
+    wordcloud = WordCloud(
+        width=width,
+        height=height,
+        background_color=background_color,
+        collocations=False,
+        prefer_horizontal=prefer_horizontal
+    ).generate(' '.join(keywords))
+    # WordCloud draws with PIL directly, so no matplotlib figure is needed
+    buffer = io.BytesIO()
+    wordcloud.to_image().save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@tracing.traced("render.bar_chart")
+def _bar_chart_png(labels, values, title, figsize, dpi):
+    # An explicitly owned Figure (not pyplot) is freed as soon as it goes out of scope
+    fig = Figure(figsize=figsize, dpi=dpi)
+    ax = fig.subplots()
+    ax.barh(labels[::-1], values[::-1], color="#4c78a8")
+    ax.set_xlabel(title)
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def render_wordcloud(keywords, width=1000, height=500, background_color='white', prefer_horizontal=0.8):
+    """PNG bytes of a word cloud for the given keywords"""
+    keywords = tuple(keywords)
+    key = ('wordcloud', keywords, width, height, background_color, prefer_horizontal)
+    return _render_cached(key, _wordcloud_png, keywords, width, height, background_color, prefer_horizontal)
+
+
+def render_bar_chart(counts, title="Count", figsize=(10, 6), dpi=100):
+    """PNG bytes of a horizontal bar chart for (label, value) pairs, largest first"""
+    counts = tuple((str(label), float(value)) for label, value in counts)
+    key = ('bar', counts, title, figsize, dpi)
+    labels = [label for label, _ in counts]
+    values = [value for _, value in counts]
+    return _render_cached(key, _bar_chart_png, labels, values, title, figsize, dpi)
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import os
+import threading
+
+# Where each NLTK package lives inside nltk_data, for the offline presence check
+NLTK_PATHS = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+    'wordnet': 'corpora/wordnet',
+    'vader_lexicon': 'sentiment/vader_lexicon.zip',
+}
+
+_loaders = {}
+_resources = {}
+_locks = {}
+_registry_lock = threading.Lock()
+_warmup_thread = None
+
+
+def register(name, loader):
+    """Register a zero-argument loader for a shared model or corpus"""
+    with _registry_lock:
+        _loaders[name] = loader
+        _locks.setdefault(name, threading.Lock())
+
+
+def get(name):
+    """Return the named resource, loading it on first use only"""
+    try:
+        return _resources[name]
+    except KeyError:
+        pass
+    with _locks[name]:
+        if name not in _resources:
+            _resources[name] = _loaders[name]()
+    return _resources[name]
+
+
+def is_loaded(name):
+    return name in _resources
+
+
+def unload(name):
+    """Forget a loaded resource so the next get() loads it again; returns it or None"""
+    with _locks[name]:
+        return _resources.pop(name, None)
+
+
+def has_nltk_data(package):
+    """Check whether an NLTK package is installed without touching the network"""
+    # Imported here: importing nltk loads scipy.stats and takes seconds
+    import nltk
+    try:
+        nltk.data.find(NLTK_PATHS.get(package, package))
+        return True
+    except LookupError:
+        return False
+
+
+def ensure_nltk_data(*packages):
+    """Download NLTK packages only if they are missing; never raises when offline"""
+    missing = [p for p in packages if not has_nltk_data(p)]
+    if missing:
+        import nltk
+        try:
+            nltk.download(missing, quiet=True, raise_on_error=False)
+        except Exception:
+            pass
+    return not [p for p in missing if not has_nltk_data(p)]
+
+
+def warm_up(names=None):
+    """Load resources on a background daemon thread (once per process)"""
+    global _warmup_thread
+    if os.environ.get('INSIGHT_WARMUP', '1') == '0':
+        return None
+    with _registry_lock:
+        if _warmup_thread is not None:
+            return _warmup_thread
+        names = list(names or _loaders)
+        if os.environ.get('INSIGHT_NLP_SOCKET'):
+            # The shared NLP worker holds these models; don't load copies here
+            names = [name for name in names if name not in ('spacy', 'vader')]
+
+        def run():
+            for name in names:
+                try:
+                    get(name)
+                except Exception:
+                    # The page that needs it will load it again and report the error
+                    pass
+
+        _warmup_thread = threading.Thread(target=run, name='resource-warmup', daemon=True)
+        _warmup_thread.start()
+        return _warmup_thread
+
+
+def _load_stopwords():
+    from nltk.corpus import stopwords
+    ensure_nltk_data('stopwords')
+    return frozenset(stopwords.words('english'))
+
+
+def _load_wordnet():
+    ensure_nltk_data('wordnet')
+    return True
+
+
+def _load_vader():
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    ensure_nltk_data('vader_lexicon')
+    return SentimentIntensityAnalyzer()
+
+
+def _load_spacy():
+    import spacy
+    # Keywords and lemmas only need the tagger and lemmatizer, so the dependency
+    # parser and NER are left out and sentence boundaries come from the sentencizer
+    nlp = spacy.load("en_core_web_sm", exclude=["parser", "ner"])
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
+register('stopwords', _load_stopwords)
+register('wordnet', _load_wordnet)
+register('vader', _load_vader)
+register('spacy', _load_spacy)
\ No newline at end of file
@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from document_analysis import text_key
+from tokenizer import tokenize
+
+# Only the best-scoring sentences take part in the knapsack pass
+MAX_CANDIDATES = 400
+# Number of recent texts whose sentence index is kept in memory
+INDEX_CACHE_SIZE = 8
+
+_index_cache = OrderedDict()
+_index_lock = threading.Lock()
+
+
+class SentenceIndex:
+    """Sentences of a text, each tokenized exactly once.
+
+    Tokens of all sentences are stored back to back in ``token_ids`` (ids
+    into ``vocab``, lowercased); sentence ``i`` owns the slice
+    ``starts[i]:starts[i] + lengths[i]``.
+    """
+
+    def __init__(self, text):
+        # Boundaries are shared with every other page that tokenizes this text
+        self.tokens = tokenize(text)
+        self.vocab = {}
+        setdefault = self.vocab.setdefault
+        self.token_ids = np.array([setdefault(word, len(self.vocab)) for word in self.tokens.words(lower=True)],
+                                  dtype=np.int32)
+        self.lengths = self.tokens.sentence_lengths()
+        self.starts = self.tokens.first_word[:-1]
+
+    def __len__(self):
+        return self.tokens.num_sentences
+
+    def sentence(self, i):
+        return self.tokens.sentence(i)
+
+    def keyword_scores(self, keywords):
+        """Number of keyword tokens in each sentence"""
+        is_keyword = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        is_keyword[[self.vocab[k] for k in keywords if k in self.vocab]] = 1
+        hits = np.concatenate([[0], np.cumsum(is_keyword[self.token_ids])])
+        return hits[self.starts + self.lengths] - hits[self.starts]
+
+    def position_scores(self, weight=0.5):
+        """Earlier sentences score higher, from ``weight`` down towards 0"""
+        n = len(self)
+        return weight * (1 - np.arange(n) / n) if n else np.zeros(0)
+
+
+def get_sentence_index(text):
+    """SentenceIndex for text, reused while the text stays the same"""
+    key = text_key(text)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+            return index
+    index = SentenceIndex(text)
+    with _index_lock:
+        _index_cache[key] = index
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+    return index
+
+
+def clear_cache():
+    with _index_lock:
+        _index_cache.clear()
+
+
+def select_sentences(scores, lengths, budget, max_candidates=MAX_CANDIDATES):
+    """Pick sentences maximizing total score with total length <= budget (0/1 knapsack).
+
+    Returns indices ordered by descending score.
+    """
+    budget = int(budget)
+    if budget <= 0 or not len(scores):
+        return []
+    candidates = np.flatnonzero((lengths > 0) & (lengths <= budget))
+    candidates = candidates[np.argsort(-scores[candidates], kind='stable')][:max_candidates]
+
+    best = np.zeros(budget + 1)
+    keep = np.zeros((len(candidates), budget + 1), dtype=bool)
+    for j, i in enumerate(candidates):
+        w = int(lengths[i])
+        taken = best[:budget + 1 - w] + scores[i]
+        improved = taken > best[w:]
+        keep[j, w:] = improved
+        best[w:] = np.where(improved, taken, best[w:])
+
+    chosen = []
+    capacity = budget
+    for j in range(len(candidates) - 1, -1, -1):
+        if keep[j, capacity]:
+            chosen.append(candidates[j])
+            capacity -= int(lengths[candidates[j]])
+    chosen.sort()
+    return sorted(chosen, key=lambda i: -scores[i])
\ No newline at end of file
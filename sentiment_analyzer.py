@@ -1,40 +1,132 @@
 import streamlit as st
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.tokenize import sent_tokenize
-import nltk
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import pandas as pd
+from history import remember_text
+from incremental import sentiment_profile
+import resources
+import tracing
+from nlp_worker import get_client
 
-nltk.download('vader_lexicon')
+SCORE_KEYS = ('compound', 'pos', 'neg', 'neu')
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+# Batches smaller than this are scored in-process even if n_process > 1
+POOL_MIN_BATCH = 2000
+# Sentences shown per page of a result table
+PAGE_SIZE = 50
+LABELS = ('positive', 'negative', 'neutral')
+SORT_ORDERS = ("Document order", "Highest score first", "Lowest score first")
 
-def analyze_sentiment(text):
-    sia = SentimentIntensityAnalyzer()
-    sentences = sent_tokenize(text)
-    
-    results = {
-        'positive': [],
-        'negative': [],
-        'neutral': [],
-        'scores': {'compound': 0, 'pos': 0, 'neg': 0, 'neu': 0}
-    }
-    
-    for sentence in sentences:
-        scores = sia.polarity_scores(sentence)
-        results['scores']['compound'] += scores['compound']
-        results['scores']['pos'] += scores['pos']
-        results['scores']['neg'] += scores['neg']
-        results['scores']['neu'] += scores['neu']
-        
-        if scores['compound'] >= 0.05:
-            results['positive'].append(sentence)
-        elif scores['compound'] <= -0.05:
-            results['negative'].append(sentence)
+def _score_chunk(texts):
+    """Score texts with the process-wide VADER analyzer into a (n, 4) array"""
+    sia = resources.get('vader')
+    scores = np.empty((len(texts), len(SCORE_KEYS)), dtype=np.float64)
+    for i, text in enumerate(texts):
+        polarity = sia.polarity_scores(text)
+        scores[i] = [polarity[key] for key in SCORE_KEYS]
+    return scores
+
+def score_batch(texts, n_process=1):
+    """Score many documents or sentences at once.
+
+    Returns a dict of NumPy arrays keyed by 'compound', 'pos', 'neg' and 'neu'.
+    With ``n_process`` > 1 (or None for every core) large batches are split
+    across a process pool, each worker loading VADER once. With a shared NLP
+    worker configured, scoring happens there instead.
+    """
+    texts = list(texts)
+    tracing.count("vader.texts", len(texts))
+    if n_process is None:
+        n_process = os.cpu_count() or 1
+    client = get_client()
+    with tracing.span("vader.score"):
+        if client is not None:
+            scores = client.polarity_scores(texts)
+        elif n_process > 1 and len(texts) >= POOL_MIN_BATCH:
+            size = -(-len(texts) // n_process)
+            chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+            with ProcessPoolExecutor(max_workers=n_process) as pool:
+                scores = np.concatenate(list(pool.map(_score_chunk, chunks)))
         else:
-            results['neutral'].append(sentence)
-    
-    num_sentences = len(sentences)
-    for key in results['scores']:
-        results['scores'][key] = round(results['scores'][key] / num_sentences, 2) if num_sentences > 0 else 0
+            scores = _score_chunk(texts)
+    return {key: scores[:, i] for i, key in enumerate(SCORE_KEYS)}
+
+def label_scores(compound):
+    """Vectorized thresholding: 1 positive, -1 negative, 0 neutral"""
+    compound = np.asarray(compound)
+    return np.where(compound >= POSITIVE_THRESHOLD, 1,
+                    np.where(compound <= NEGATIVE_THRESHOLD, -1, 0)).astype(np.int8)
+
+def analyze_sentiment(text, n_process=1):
+    """Sentence offsets into text with their VADER scores, plus document-level means.
+
+    'starts' and 'ends' delimit each sentence in text, 'sentence_scores' is a
+    float32 (n, 4) array in SCORE_KEYS order, and 'positive', 'negative' and
+    'neutral' hold the indices of the sentences with that label. Use
+    ``sentence_texts`` to get the sentences themselves.
+    """
+    # Only paragraphs changed since this session's last call are tokenized and scored
+    with tracing.span("sentiment.profile"):
+        profile = sentiment_profile(text, n_process)
+    segments = profile.ordered()
+    if segments:
+        starts = np.concatenate([offset + result[0] for offset, result in zip(profile.starts, segments)])
+        ends = np.concatenate([offset + result[1] for offset, result in zip(profile.starts, segments)])
+        scores = np.concatenate([result[2] for result in segments])
+    else:
+        starts = ends = np.zeros(0, dtype=np.int64)
+        scores = np.zeros((0, len(SCORE_KEYS)), dtype=np.float32)
+    labels = label_scores(scores[:, 0])
+    totals = profile.totals
     
-    return results
+    return {
+        'starts': starts,
+        'ends': ends,
+        'sentence_scores': scores,
+        'positive': np.flatnonzero(labels == 1),
+        'negative': np.flatnonzero(labels == -1),
+        'neutral': np.flatnonzero(labels == 0),
+        'scores': {key: round(float(totals['sum'][i] / totals['count']), 2) if totals['count'] else 0
+                   for i, key in enumerate(SCORE_KEYS)}
+    }
+
+def sentence_texts(text, results, indices):
+    """The sentences at ``indices`` of an analyze_sentiment result for text"""
+    return [text[start:end] for start, end in zip(results['starts'][indices].tolist(),
+                                                  results['ends'][indices].tolist())]
+
+def sentence_table(text, results, label):
+    """One page of the sentences with a label, sortable and filterable by compound score.
+
+    Only the rows on the current page are sliced out of the text, so rendering
+    costs the same for ten sentences or a hundred thousand.
+    """
+    indices = results[label]
+    compound = results['sentence_scores'][indices, 0]
+    col1, col2 = st.columns(2)
+    with col1:
+        order = st.selectbox("Sort by", SORT_ORDERS, key=f"sentiment_sort_{label}")
+    with col2:
+        low, high = st.slider("Compound score", -1.0, 1.0, (-1.0, 1.0), 0.05, key=f"sentiment_range_{label}")
+    keep = (compound >= low) & (compound <= high)
+    indices, compound = indices[keep], compound[keep]
+    if order == SORT_ORDERS[1]:
+        indices = indices[np.argsort(-compound, kind='stable')]
+    elif order == SORT_ORDERS[2]:
+        indices = indices[np.argsort(compound, kind='stable')]
+
+    pages = max(1, -(-len(indices) // PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1,
+                           key=f"sentiment_page_{label}")
+    shown = indices[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    scores = results['sentence_scores'][shown]
+    st.caption(f"{len(indices)} of {len(results[label])} sentences match")
+    st.dataframe(pd.DataFrame({
+        'Sentence': sentence_texts(text, results, shown),
+        **{key.capitalize(): scores[:, i] for i, key in enumerate(SCORE_KEYS)},
+    }, index=shown + 1))
 
 def sentiment_page():
     st.subheader("Advanced Sentiment Analysis")
@@ -42,6 +134,11 @@ def sentiment_page():
                        value=st.session_state.get('selected_text', ''))
     
     if text and st.button("Analyze Sentiment"):
+        remember_text(text)
+        st.session_state.sentiment_text = text
+    
+    # Kept across reruns so paging and sorting don't need another click
+    if text and st.session_state.get('sentiment_text') == text:
         with st.spinner("Analyzing sentiment..."):
             results = analyze_sentiment(text)
             
@@ -56,16 +153,8 @@ def sentiment_page():
             with col3:
                 st.metric("Negative Score", f"{results['scores']['neg']:.2f}")
             
-            tab1, tab2, tab3 = st.tabs(["Positive", "Negative", "Neutral"])
-            with tab1:
-                st.write(f"**{len(results['positive'])} Positive Sentences:**")
-                for sent in results['positive']:
-                    st.write(f"- {sent}")
-            with tab2:
-                st.write(f"**{len(results['negative'])} Negative Sentences:**")
-                for sent in results['negative']:
-                    st.write(f"- {sent}")
-            with tab3:
-                st.write(f"**{len(results['neutral'])} Neutral Sentences:**")
-                for sent in results['neutral']:
-                    st.write(f"- {sent}")
\ No newline at end of file
+            tabs = st.tabs(["Positive", "Negative", "Neutral"])
+            for tab, label in zip(tabs, LABELS):
+                with tab:
+                    st.write(f"**{len(results[label])} {label.capitalize()} Sentences:**")
+                    sentence_table(text, results, label)
\ No newline at end of file
@@ -1,15 +1,94 @@
 import streamlit as st
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
+import tracing
 
+@tracing.traced("similarity.tfidf")
 def calculate_similarity(text1, text2):
     vectorizer = TfidfVectorizer(stop_words='english')
     tfidf_matrix = vectorizer.fit_transform([text1, text2])
     similarity = cosine_similarity(tfidf_matrix[0], tfidf_matrix[1])[0][0]
     return round(similarity * 100, 2)
 
+def search_saved_texts():
+    from auth import get_db
+    from similarity_index import get_index
+    
+    text = st.text_area("Text to search for", height=150,
+                        value=st.session_state.get('selected_text', ''))
+    top_k = st.slider("Number of results", min_value=1, max_value=20, value=5)
+    
+    if text and st.button("Search"):
+        with st.spinner("Searching saved texts..."):
+            db = get_db()
+            index = get_index()
+            index.sync_from_db(db)
+            matches = index.query(text, top_k, owner=st.session_state.get('username'))
+        
+        if not matches:
+            st.info("No similar saved texts found.")
+            return
+        
+        ids = [doc_id for doc_id, _ in matches]
+        placeholders = ",".join("?" * len(ids))
+        rows = db.query(f"SELECT id, substr(text, 1, 200), created_at FROM texts WHERE id IN ({placeholders})",
+                        ids)
+        previews = {row[0]: (row[1], row[2]) for row in rows}
+        for doc_id, similarity in matches:
+            preview, created_at = previews.get(doc_id, ("", ""))
+            st.markdown(f"**{similarity}%** — saved {created_at}")
+            st.caption(preview)
+
+def find_duplicates():
+    from near_duplicates import find_near_duplicates
+    
+    source = st.radio("Documents", ["Uploaded Files", "My Saved Texts"], horizontal=True)
+    threshold = st.slider("Jaccard similarity threshold", min_value=0.5, max_value=1.0, value=0.8, step=0.05)
+    
+    if source == "Uploaded Files":
+        from file_processor import extract_text
+        files = st.file_uploader("Choose files (PDF or DOCX)", type=["pdf", "docx"], accept_multiple_files=True)
+        if not files or not st.button("Find Near-Duplicates"):
+            return
+        # Numbered so that uploads sharing a file name stay separate documents
+        texts = {f"{i}. {f.name}": extract_text(f) for i, f in enumerate(files, 1)}
+        docs = texts.items()
+    else:
+        from auth import get_db
+        if not st.button("Find Near-Duplicates"):
+            return
+        texts = {}
+        
+        def docs_from_db():
+            for doc_id, created_at, text in get_db().iterate(
+                    "SELECT id, created_at, text FROM texts WHERE username=? ORDER BY id",
+                    (st.session_state.get('username'),)):
+                label = f"#{doc_id} ({created_at})"
+                texts[label] = text[:200]
+                yield label, text
+        docs = docs_from_db()
+    
+    with st.spinner("Finding near-duplicates..."):
+        clusters = find_near_duplicates(docs, threshold)
+    
+    if not clusters:
+        st.success("No near-duplicates found.")
+    for i, cluster in enumerate(clusters, 1):
+        with st.expander(f"Group {i}: {len(cluster)} documents"):
+            for label in cluster:
+                st.markdown(f"**{label}**")
+                st.caption(texts[label][:200])
+
 def similarity_page():
     st.subheader("Text Similarity Analyzer")
+    mode = st.radio("Mode", ["Compare Two Texts", "Search Saved Texts", "Find Near-Duplicates"], horizontal=True)
+    if mode == "Search Saved Texts":
+        search_saved_texts()
+        return
+    if mode == "Find Near-Duplicates":
+        find_duplicates()
+        return
+    
     col1, col2 = st.columns(2)
     
     with col1:
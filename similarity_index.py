@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import resources
+
+INDEX_DIR = 'similarity_index'
+
+
+class SimilarityIndex:
+    """TF-IDF index over the saved texts, kept on disk between runs.
+
+    Raw term counts are stored as a sparse matrix with a growable vocabulary,
+    so new documents can be added without refitting. IDF weights follow
+    scikit-learn's smoothed formula and are recomputed from document
+    frequencies whenever the corpus changes.
+    """
+
+    def __init__(self, path=INDEX_DIR):
+        self.path = path
+        self.vocabulary = {}
+        self.doc_ids = []
+        self.owners = []
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.float64)
+        self._analyzer = TfidfVectorizer(stop_words='english').build_analyzer()
+        self._weights = None
+        self._idf = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path=INDEX_DIR):
+        index = cls(path)
+        meta_path = os.path.join(path, 'index.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            index.vocabulary = meta['vocabulary']
+            index.doc_ids = meta['doc_ids']
+            index.owners = meta['owners']
+            index.counts = sparse.load_npz(os.path.join(path, 'counts.npz')).tocsr()
+        return index
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            counts_tmp = os.path.join(self.path, 'counts.tmp.npz')
+            meta_tmp = os.path.join(self.path, 'index.json.tmp')
+            sparse.save_npz(counts_tmp, self.counts)
+            with open(meta_tmp, 'w') as f:
+                json.dump({'vocabulary': self.vocabulary, 'doc_ids': self.doc_ids,
+                           'owners': self.owners}, f)
+            os.replace(counts_tmp, os.path.join(self.path, 'counts.npz'))
+            os.replace(meta_tmp, os.path.join(self.path, 'index.json'))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def _term_counts(self, text, grow):
+        """Column ids and counts for text; unknown terms are added when grow is set"""
+        counts = {}
+        unknown = {}
+        for term in self._analyzer(text):
+            col = self.vocabulary.get(term)
+            if col is None:
+                if not grow:
+                    unknown[term] = unknown.get(term, 0) + 1
+                    continue
+                col = self.vocabulary[term] = len(self.vocabulary)
+            counts[col] = counts.get(col, 0) + 1
+        return counts, unknown
+
+    def add_documents(self, docs):
+        """Add (doc_id, owner, text) triples to the index"""
+        with self._lock:
+            rows, cols, data = [], [], []
+            start = len(self.doc_ids)
+            for doc_id, owner, text in docs:
+                counts, _ = self._term_counts(text, grow=True)
+                row = len(self.doc_ids) - start
+                rows.extend([row] * len(counts))
+                cols.extend(counts.keys())
+                data.extend(counts.values())
+                self.doc_ids.append(doc_id)
+                self.owners.append(owner)
+            added = len(self.doc_ids) - start
+            if not added:
+                return 0
+            shape = (start, len(self.vocabulary))
+            existing = self.counts
+            existing.resize(shape)
+            new = sparse.csr_matrix((data, (rows, cols)), shape=(added, len(self.vocabulary)), dtype=np.float64)
+            self.counts = sparse.vstack([existing, new], format='csr')
+            self._weights = None
+            return added
+
+    def _idf_weights(self):
+        n_docs = self.counts.shape[0]
+        df = np.bincount(self.counts.indices, minlength=self.counts.shape[1])
+        return np.log((1 + n_docs) / (1 + df)) + 1
+
+    def _matrix(self):
+        """L2-normalized TF-IDF document matrix, cached until the corpus changes"""
+        if self._weights is None:
+            self._idf = self._idf_weights()
+            weights = self.counts @ sparse.diags(self._idf)
+            norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+            norms[norms == 0] = 1
+            self._weights = sparse.diags(1 / norms) @ weights
+            self._weights = self._weights.tocsr()
+        return self._weights
+
+    def idf(self, words):
+        """Smoothed IDF of each word over the indexed texts, looked up as the index's analyzer
+        normalizes it. Unseen words get the highest weight; words the analyzer drops as
+        stopwords get the lowest, 1.
+        """
+        with self._lock:
+            if not self.doc_ids:
+                return np.ones(len(words))
+            self._matrix()
+            unseen = np.log(1 + len(self.doc_ids)) + 1
+            weights = []
+            for word in words:
+                terms = self._analyzer(word)
+                weights.append(np.mean([self._idf[self.vocabulary[t]] if t in self.vocabulary else unseen
+                                        for t in terms]) if terms else 1.0)
+            return np.array(weights, dtype=np.float64)
+
+    def query(self, text, k=5, owner=None):
+        """Top-k (doc_id, similarity %) pairs for text, optionally limited to one owner"""
+        with self._lock:
+            if not self.doc_ids:
+                return []
+            matrix = self._matrix()
+            counts, unknown = self._term_counts(text, grow=False)
+            if not counts:
+                return []
+            cols = np.fromiter(counts.keys(), dtype=np.int64)
+            values = np.fromiter(counts.values(), dtype=np.float64) * self._idf[cols]
+            # Terms the corpus has never seen still count towards the query's norm
+            unseen_idf = np.log(1 + len(self.doc_ids)) + 1
+            norm = np.sqrt((values ** 2).sum() + sum((c * unseen_idf) ** 2 for c in unknown.values()))
+            query = np.zeros(matrix.shape[1])
+            query[cols] = values / norm
+            scores = matrix @ query
+            if owner is not None:
+                scores[np.asarray(self.owners) != owner] = -1
+            k = min(k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            return [(self.doc_ids[i], round(float(scores[i]) * 100, 2)) for i in top if scores[i] > 0]
+
+    def sync_from_db(self, db):
+        """Index rows of the texts table added since the last sync"""
+        with self._lock:
+            last_id = max(self.doc_ids) if self.doc_ids else 0
+            added = self.add_documents(db.iterate("SELECT id, username, text FROM texts WHERE id > ? ORDER BY id",
+                                                  (last_id,)))
+            if added:
+                self.save()
+            return added
+
+
+resources.register('similarity_index', SimilarityIndex.load)
+
+
+def get_index():
+    return resources.get('similarity_index')
\ No newline at end of file
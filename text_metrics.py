@@ -0,0 +1,143 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from document_analysis import split_into_chunks
+from tokenizer import tokenize
+import resources
+
+# Texts longer than this are split into chunks and measured across cores
+PARALLEL_MIN_CHARS = 500000
+CHUNK_CHARS = 200000
+HLL_PRECISION = 14
+
+
+class HyperLogLog:
+    """Mergeable cardinality sketch (about 0.8% error at the default precision)"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_many(self, items):
+        items = list(items)
+        if not items:
+            return
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), 'big') for item in items),
+            dtype=np.uint64, count=len(items))
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - p)) - 1)
+        # Rank = position of the leftmost 1-bit in the remaining 64 - p bits
+        bit_length = np.zeros(len(rest), dtype=np.int64)
+        nonzero = rest > 0
+        bit_length[nonzero] = np.frexp(rest[nonzero].astype(np.float64))[1]
+        rank = (64 - p - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def __len__(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(2.0 ** -self.registers.astype(np.float64))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class MetricsPartial:
+    """Counts for one chunk of text; partials from different chunks merge by addition"""
+
+    def __init__(self, exact=True):
+        self.chars = 0
+        self.words = 0
+        self.word_chars = 0
+        self.sentences = 0
+        self.stopwords = 0
+        self.lemmas = set() if exact else HyperLogLog()
+
+    def merge(self, other):
+        self.chars += other.chars
+        self.words += other.words
+        self.word_chars += other.word_chars
+        self.sentences += other.sentences
+        self.stopwords += other.stopwords
+        if isinstance(self.lemmas, set):
+            self.lemmas |= other.lemmas
+        else:
+            self.lemmas.merge(other.lemmas)
+        return self
+
+    def result(self):
+        unique = len(self.lemmas)
+        return {
+            'characters': self.chars,
+            'words': self.words,
+            'sentences': self.sentences,
+            'unique_words': unique,
+            'stopwords': self.stopwords,
+            'avg_word_length': self.word_chars / self.words if self.words else 0,
+            'avg_sentence_length': self.words / self.sentences if self.sentences else 0,
+            'vocabulary_richness': unique / self.words if self.words else 0,
+        }
+
+
+def measure_chunk(text, exact=True, memoize=False):
+    """Every metric for text from one tokenization (shared with the other pages when memoized)"""
+    from nltk.stem import WordNetLemmatizer
+    stop_words = resources.get('stopwords')
+    resources.get('wordnet')
+    lemmatize = WordNetLemmatizer().lemmatize
+
+    tokens = tokenize(text, memoize)
+    partial = MetricsPartial(exact)
+    partial.chars = len(text)
+    partial.words = tokens.num_words
+    partial.word_chars = int((tokens.word_ends - tokens.word_starts).sum())
+    partial.sentences = tokens.num_sentences
+    content_words = set()
+    for lower in tokens.words(lower=True):
+        if lower in stop_words:
+            partial.stopwords += 1
+        elif len(lower) > 2 and lower.isalpha():
+            content_words.add(lower)
+
+    # Lemmatize each distinct word once rather than once per occurrence
+    lemmas = {lemmatize(word) for word in content_words}
+    if exact:
+        partial.lemmas |= lemmas
+    else:
+        partial.lemmas.add_many(lemmas)
+    return partial
+
+
+def _measure(args):
+    return measure_chunk(*args)
+
+
+def compute_text_metrics(text, n_process=None, exact=True):
+    """Text statistics computed chunk by chunk and merged map-reduce style.
+
+    Long texts are measured across ``n_process`` processes (every core by
+    default). With ``exact=False`` unique words are counted with a
+    HyperLogLog sketch instead of a set.
+    """
+    if n_process is None:
+        n_process = (os.cpu_count() or 1) if len(text) >= PARALLEL_MIN_CHARS else 1
+    if n_process > 1:
+        chunks = [(chunk, exact) for _, chunk in split_into_chunks(text, CHUNK_CHARS)]
+        if len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=min(n_process, len(chunks))) as pool:
+                total = MetricsPartial(exact)
+                for partial in pool.map(_measure, chunks):
+                    total.merge(partial)
+            return total.result()
+    # In one process, reuse (and remember) the tokens the other pages use
+    return measure_chunk(text, exact, memoize=True).result()
\ No newline at end of file
@@ -1,72 +1,55 @@
 import streamlit as st
-import nltk
-import spacy
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from collections import Counter  # Add this import
+from keywords import extract_keywords, DEFAULT_ALGORITHM
+from sentence_index import get_sentence_index, select_sentences
+from history import remember_text
+from jobs import register_operation, submit_job, job_panel
+from tokenizer import tokenize, word_count
+import tracing
 
-nlp = spacy.load("en_core_web_sm")
-nltk.download(['punkt', 'stopwords', 'wordnet'])
+QUALITY_POS = ('NOUN', 'PROPN', 'VERB')
 
-def extract_quality_keywords(text, top_n=20):
-    doc = nlp(text)
-    nouns = [token.text.lower() for token in doc if token.pos_ in ['NOUN', 'PROPN'] and token.is_alpha]
-    verbs = [token.lemma_ for token in doc if token.pos_ == 'VERB' and token.is_alpha]
-    
-    words = nouns + verbs
-    words = [w for w in words if len(w) > 2 and w not in stopwords.words('english')]
-    
-    word_counts = Counter(words)
-    unique_words = []
-    seen_lemmas = set()
-    
-    for word, count in word_counts.most_common(top_n*3):
-        lemma = nlp(word)[0].lemma_
-        if lemma not in seen_lemmas:
-            unique_words.append((word, count))
-            seen_lemmas.add(lemma)
-            if len(unique_words) >= top_n:
-                break
-    
-    return [w[0] for w in unique_words]
+def extract_quality_keywords(text, top_n=20, algorithm=DEFAULT_ALGORITHM):
+    """Top nouns and verbs, one per lemma, as they are most often written in the text"""
+    return [form for _, form, _ in extract_keywords(text, top_n, algorithm, QUALITY_POS)]
 
-def improved_summarize(text, word_count=50):
-    sentences = sent_tokenize(text)
-    if len(sentences) < 2:
-        return text[:500], len(word_tokenize(text[:500]))
-    
-    keywords = set(extract_quality_keywords(text, 15))
-    sentence_scores = {}
+def improved_summarize(text, word_count=50, in_document_order=False, report=None):
+    """(summary, word count); ``report(fraction)`` is called after each step when given (see jobs)"""
+    report = report or (lambda fraction: None)
+    index = get_sentence_index(text)
+    report(0.2)
+    if len(index) < 2:
+        return text[:500], tokenize(text[:500], memoize=False).num_words
     
-    for i, sentence in enumerate(sentences):
-        score = 0
-        words = word_tokenize(sentence.lower())
-        score += sum(1 for word in words if word in keywords)
-        score += 0.5 * (1 - i/len(sentences))
-        sentence_scores[sentence] = score
+    with tracing.span("summarize.keywords"):
+        keywords = set(extract_quality_keywords(text, 15))
+    report(0.7)
+    with tracing.span("summarize.score"):
+        scores = index.keyword_scores(keywords) + index.position_scores()
+    report(0.8)
     
-    sorted_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)
-    summary = []
-    total_words = 0
-    
-    for sentence, _ in sorted_sentences:
-        words_in_sentence = len(word_tokenize(sentence))
-        if total_words + words_in_sentence <= word_count:
-            summary.append(sentence)
-            total_words += words_in_sentence
-        else:
-            break
+    with tracing.span("summarize.select"):
+        selected = select_sentences(scores, index.lengths, word_count)
+    report(0.9)
+    if in_document_order:
+        selected = sorted(selected)
     
+    summary = [index.sentence(i) for i in selected]
+    total_words = int(index.lengths[selected].sum()) if selected else 0
     return ' '.join(summary), total_words
 
+def _summarize_job(text, report, word_count):
+    return list(improved_summarize(text, word_count, report=report))
+
+register_operation('summarize', _summarize_job)
+
 def summarize_page():
     st.subheader("Advanced Text Summarization")
     text = st.text_area("Enter text (up to 500,000 words)", height=300, 
                        value=st.session_state.get('selected_text', ''), max_chars=500000*6)
     
     if text:
-        input_word_count = len(word_tokenize(text))
+        # Memoized: reruns of the page don't tokenize the text again
+        input_word_count = word_count(text)
         st.write(f"Input Word Count: {input_word_count}")
         
         summary_length = st.slider("Summary length (words)", 
@@ -75,8 +58,15 @@ def summarize_page():
                                  value=min(100, input_word_count))
         
         if st.button("Generate Quality Summary"):
-            with st.spinner("Creating optimized summary..."):
-                summary, output_word_count = improved_summarize(text, summary_length)
+            remember_text(text)
+            # Runs in the background: other widgets stay usable while it works
+            st.session_state.summary_job = submit_job('summarize', text, {'word_count': summary_length})
+        
+        job = job_panel(st.session_state.get('summary_job'))
+        if job and job['status'] == 'done':
+            summary, output_word_count = job['result']
+            if st.session_state.get('summary_job_shown') != job['id']:
+                st.session_state.summary_job_shown = job['id']
                 st.session_state.selected_text = summary
-                st.subheader(f"Summary (Reduced from {input_word_count} to {output_word_count} words)")
-                st.text_area("Summary", summary, height=200)
\ No newline at end of file
+            st.subheader(f"Summary (Reduced from {input_word_count} to {output_word_count} words)")
+            st.text_area("Summary", summary, height=200)
\ No newline at end of file
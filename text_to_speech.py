@@ -1,7 +1,113 @@
 import streamlit as st
-from gtts import gTTS
-import tempfile
+import io
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from gtts import gTTS
+from disk_cache import CACHE_DIR, DiskCache, content_hash
+from document_analysis import split_into_chunks
+import tracing
+from jobs import register_operation, submit_job, job_panel
+
+# Sentence-sized pieces: small enough that the first one comes back quickly
+MAX_SEGMENT_CHARS = 400
+MAX_CONCURRENCY = 4
+
+# Synthesized segment audio keyed by (synthesizer, language, text) hash
+tts_cache = DiskCache(os.path.join(CACHE_DIR, 'tts'), 256 * 1024 * 1024)
+
+class Synthesizer:
+    """Interface for speech backends: turn one segment of text into MP3 bytes"""
+    name = 'base'
+
+    def synthesize(self, text, lang):
+        raise NotImplementedError
+
+class GTTSSynthesizer(Synthesizer):
+    name = 'gtts'
+
+    def synthesize(self, text, lang):
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, slow=False).write_to_fp(buffer)
+        return buffer.getvalue()
+
+class StubSynthesizer(Synthesizer):
+    """Offline backend for tests and benchmarks; returns deterministic fake audio"""
+    name = 'stub'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def synthesize(self, text, lang):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return f"{lang}:{content_hash(text)}\n".encode()
+
+def split_speech_segments(text, max_chars=MAX_SEGMENT_CHARS):
+    """Non-empty sentence-sized pieces of text, in order"""
+    return [chunk.strip() for _, chunk in split_into_chunks(text, max_chars) if chunk.strip()]
+
+def _segment_key(synthesizer_name, lang, segment):
+    return content_hash(f"{synthesizer_name}\0{lang}\0{segment}")
+
+def cached_preview(text, lang, synthesizer_name=GTTSSynthesizer.name):
+    """Audio of the first segment if it has been synthesized already, else None"""
+    for _, chunk in split_into_chunks(text, MAX_SEGMENT_CHARS):
+        if chunk.strip():
+            return tts_cache.get(_segment_key(synthesizer_name, lang, chunk.strip()), 'audio.mp3')
+    return None
+
+def iter_speech(text, lang, synthesizer=None, concurrency=MAX_CONCURRENCY):
+    """Yield MP3 bytes for each segment in order; segments are synthesized concurrently
+    and the first is yielded as soon as it is ready"""
+    synthesizer = synthesizer or GTTSSynthesizer()
+    segments = split_speech_segments(text)
+    keys = [_segment_key(synthesizer.name, lang, segment) for segment in segments]
+    
+    @tracing.traced("tts.segment")
+    def synthesize(segment, key):
+        audio = synthesizer.synthesize(segment, lang)
+        tts_cache.put(key, 'audio.mp3', audio)
+        return audio
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = {}
+        for segment, key in zip(segments, keys):
+            if key not in pending and tts_cache.get(key, 'audio.mp3') is None:
+                pending[key] = pool.submit(synthesize, segment, key)
+        tracing.count("tts.cache_miss", len(pending))
+        try:
+            for segment, key in zip(segments, keys):
+                audio = pending[key].result() if key in pending else tts_cache.get(key, 'audio.mp3')
+                if audio is None:
+                    # Evicted since the lookup above
+                    audio = synthesize(segment, key)
+                yield audio
+        except BaseException:
+            # Closed early (a cancelled job) or failed: only wait for the segments already being synthesized
+            pool.shutdown(cancel_futures=True)
+            raise
+
+def synthesize_speech(text, lang, synthesizer=None, concurrency=MAX_CONCURRENCY):
+    """Full MP3 for text (MP3 frames can be concatenated directly)"""
+    return b"".join(iter_speech(text, lang, synthesizer, concurrency))
+
+def _speech_job(text, report, lang):
+    total = len(split_speech_segments(text))
+    parts = []
+    speech = iter_speech(text, lang)
+    try:
+        for audio in speech:
+            parts.append(audio)
+            report(len(parts) / total)
+    finally:
+        # On cancellation, stop the remaining segments now rather than when the generator is collected
+        speech.close()
+    return b"".join(parts)
+
+register_operation('tts', _speech_job)
 
 def tts_page():
     st.subheader("Text-to-Speech Conversion")
@@ -19,25 +125,24 @@ def tts_page():
         ], format_func=lambda x: x[0])
         
         if st.button("Generate Speech"):
-            with st.spinner("Creating audio..."):
-                try:
-                    tts = gTTS(text=text, lang=language[1], slow=False)
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-                        tts.save(fp.name)
-                        audio_bytes = open(fp.name, 'rb').read()
-                        st.audio(audio_bytes, format='audio/mp3')
-                        
-                        st.download_button(
-                            label="Download Audio",
-                            data=audio_bytes,
-                            file_name="speech.mp3",
-                            mime="audio/mp3"
-                        )
-                except Exception as e:
-                    st.error(f"Error in text-to-speech: {str(e)}")
-                finally:
-                    if 'fp' in locals():
-                        try:
-                            os.unlink(fp.name)
-                        except:
-                            pass
\ No newline at end of file
+            st.session_state.tts_job = submit_job('tts', text, {'lang': language[1]})
+        
+        def show_preview(job):
+            # Play the first sentence while the remaining segments are synthesized
+            preview = cached_preview(text, language[1])
+            if preview:
+                st.caption("Preview (first sentence)")
+                st.audio(preview, format='audio/mp3')
+        
+        # The preview is drawn by the polling fragment, so it appears once the first segment is ready
+        job = job_panel(st.session_state.get('tts_job'), while_active=show_preview)
+        if job and job['status'] == 'done':
+            audio_bytes = job['result']
+            st.audio(audio_bytes, format='audio/mp3')
+            
+            st.download_button(
+                label="Download Audio",
+                data=audio_bytes,
+                file_name="speech.mp3",
+                mime="audio/mp3"
+            )
\ No newline at end of file
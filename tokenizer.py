@@ -0,0 +1,165 @@
+"""Sentence and word boundaries from compiled regexes, as integer offset arrays.
+
+The rules follow NLTK's ``sent_tokenize`` (Punkt with its English
+abbreviations) and ``word_tokenize`` (Treebank) closely enough for counting,
+summarizing and scoring: contractions split off as Treebank does ("do",
+"n't"), a sentence-final period is its own token, abbreviations, initials and
+numbers keep their periods. ``benchmarks/tokenizer_equivalence.py`` measures
+how closely the two agree.
+
+Nothing here creates a substring per token: boundaries come straight from
+``finditer`` over the original text and are stored as int32 arrays.
+"""
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from document_analysis import text_key
+import tracing
+
+# Number of recent texts whose tokens are kept in memory
+CACHE_SIZE = 8
+
+# Period-final words that don't end a sentence (lowercased, without the final period)
+ABBREVIATIONS = frozenset("""
+    mr mrs ms dr prof sr jr st vs etc e.g i.e cf al approx dept est fig inc ltd co corp
+    jan feb mar apr jun jul aug sep sept oct nov dec mon tue wed thu fri sat sun
+    no vol ed eds p pp gen col lt sgt capt gov sen rep rev u.s u.k a.m p.m
+""".split())
+ABBREVIATION_WINDOW = 32
+
+# A run of sentence-ending punctuation and closing quotes/brackets, then whitespace
+_SENTENCE_END_RE = re.compile(r"""[.!?]+(['"’”)\]]*)\s+(?=\S)""")
+
+# Alternatives are ordered so that ordinary words match on the first or second try
+_WORD_RE = re.compile(r"""
+    \d+(?:[.,:]\d+)+                            # 3.14, 1,000, 10:30
+  | \w+(?:-\w+|'(?!(?i:s|re|ve|ll|d|m|t)\b)\w+|\.\w+)*
+    (?:\.(?!\.)(?![.'"’”)\]]*\s*$))?            # words keep a period unless it ends the sentence
+    (?!(?i:'t)\b)                               # backs off to "do" of "don't", "ca" of "can't"
+  | (?i:n't)\b
+  | '(?i:s|re|ve|ll|d|m)\b                      # clitics: "'s" of "John's"
+  | \.{2,}                                      # ellipsis
+  | -{2,}                                       # dashes
+  | [^\w\s]                                     # any other punctuation, one character each
+""", re.VERBOSE)
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _ends_sentence(match, text, start):
+    punctuation = text[match.start():match.end(1) - len(match.group(1))]
+    if punctuation != '.':
+        # "?", "!", "?!" always end a sentence; like Punkt, an ellipsis doesn't
+        return '.' not in punctuation
+    # The word the period is attached to; anything longer than the window isn't an abbreviation
+    end = match.start()
+    window = max(start, end - ABBREVIATION_WINDOW)
+    word_start = max(text.rfind(' ', window, end), text.rfind('\n', window, end), text.rfind('\t', window, end)) + 1
+    word = text[max(word_start, window):end].lstrip('\'"‘“([').lower()
+    if word in ABBREVIATIONS:
+        return False
+    # Initials such as "J. Smith"
+    return not (len(word) == 1 and word.isalpha())
+
+
+def sentence_spans(text, start=0, end=None):
+    """(starts, ends) int32 arrays of the sentences in text[start:end], without surrounding whitespace"""
+    end = len(text) if end is None else end
+    starts = []
+    ends = []
+    position = start
+    while position < end and text[position].isspace():
+        position += 1
+    for match in _SENTENCE_END_RE.finditer(text, start, end):
+        if match.end() >= end or not _ends_sentence(match, text, start):
+            continue
+        starts.append(position)
+        ends.append(match.end(1))
+        position = match.end()
+    stop = end
+    while stop > position and text[stop - 1].isspace():
+        stop -= 1
+    if stop > position:
+        starts.append(position)
+        ends.append(stop)
+    return np.array(starts, dtype=np.int32), np.array(ends, dtype=np.int32)
+
+
+class Tokens:
+    """Sentence and word boundaries of a text.
+
+    Words of sentence ``i`` are ``word_starts[first_word[i]:first_word[i + 1]]``
+    and the matching ``word_ends``.
+    """
+
+    __slots__ = ('text', 'sent_starts', 'sent_ends', 'word_starts', 'word_ends', 'first_word')
+
+    def __init__(self, text):
+        self.text = text
+        with tracing.span("tokenize.sentences"):
+            self.sent_starts, self.sent_ends = sentence_spans(text)
+        with tracing.span("tokenize.words"):
+            # One flat list for the whole text; a sentence's "$" is its end offset
+            spans = []
+            first_word = [0]
+            for sent_start, sent_end in zip(self.sent_starts.tolist(), self.sent_ends.tolist()):
+                spans.extend(map(re.Match.span, _WORD_RE.finditer(text, sent_start, sent_end)))
+                first_word.append(len(spans))
+            spans = np.array(spans, dtype=np.int32).reshape(-1, 2)
+        self.word_starts = spans[:, 0].copy()
+        self.word_ends = spans[:, 1].copy()
+        self.first_word = np.array(first_word, dtype=np.int64)
+
+    @property
+    def num_sentences(self):
+        return len(self.sent_starts)
+
+    @property
+    def num_words(self):
+        return len(self.word_starts)
+
+    def sentence_lengths(self):
+        """Number of word tokens in each sentence"""
+        return np.diff(self.first_word)
+
+    def sentence(self, i):
+        return self.text[self.sent_starts[i]:self.sent_ends[i]]
+
+    def words(self, lower=False):
+        """Token strings; only for callers that need every token as a string"""
+        words = [self.text[s:e] for s, e in zip(self.word_starts.tolist(), self.word_ends.tolist())]
+        return [w.lower() for w in words] if lower else words
+
+
+def tokenize(text, memoize=True):
+    """Tokens of text; recent texts are remembered so every page shares one pass"""
+    if not memoize:
+        return Tokens(text)
+    key = text_key(text)
+    with _cache_lock:
+        tokens = _cache.get(key)
+        if tokens is not None:
+            _cache.move_to_end(key)
+            tracing.count("tokenize.cache_hit")
+            return tokens
+    tracing.count("tokenize.cache_miss")
+    tokens = Tokens(text)
+    with _cache_lock:
+        _cache[key] = tokens
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return tokens
+
+
+def word_count(text):
+    """Number of word and punctuation tokens, as len(word_tokenize(text)) counts them"""
+    return tokenize(text).num_words
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
\ No newline at end of file
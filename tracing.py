@@ -0,0 +1,239 @@
+import bisect
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Off unless INSIGHT_TRACING=1 or switched on from the sidebar panel
+ENABLED = os.environ.get("INSIGHT_TRACING", "0") == "1"
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILE_INTERVAL = 0.005
+METRIC_PREFIX = "insight"
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = Counter()
+
+
+class Histogram:
+    """Latency distribution over fixed buckets, plus count, sum and max"""
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate by linear interpolation inside the bucket holding the q-th observation"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            if n and seen + n >= rank:
+                low = BUCKETS[i - 1] if i else 0.0
+                high = BUCKETS[i] if i < len(BUCKETS) else self.max
+                return min(low + (high - low) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+def observe(name, seconds):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+
+def count(name, n=1):
+    """Increment a counter (e.g. cache hits); a no-op while tracing is off"""
+    if ENABLED:
+        with _lock:
+            _counters[name] += n
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name):
+    """Time the enclosed block into the ``name`` histogram.
+
+    While tracing is off this returns a shared no-op context manager, so an
+    instrumented block costs one global lookup.
+    """
+    return _Span(name) if ENABLED else _NO_SPAN
+
+
+def traced(name):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _Span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot():
+    """Plain-dict copy of every metric, safe to serialize"""
+    with _lock:
+        spans = {
+            name: {
+                'count': h.count,
+                'sum': h.sum,
+                'max': h.max,
+                'p50': h.quantile(0.5),
+                'p95': h.quantile(0.95),
+                'p99': h.quantile(0.99),
+                'buckets': dict(zip([str(b) for b in BUCKETS] + ['+Inf'], h.buckets)),
+            }
+            for name, h in sorted(_histograms.items())
+        }
+        counters = dict(sorted(_counters.items()))
+    return {'spans': spans, 'counters': counters}
+
+
+def to_json():
+    return json.dumps(snapshot(), indent=2)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus():
+    """Metrics in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = [
+        f"# HELP {METRIC_PREFIX}_stage_seconds Time spent in instrumented stages.",
+        f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+    ]
+    for name, stats in data['spans'].items():
+        stage = _label(name)
+        cumulative = 0
+        for le, n in stats['buckets'].items():
+            cumulative += n
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{{stage="{stage}"}} {stats["sum"]:.6f}')
+        lines.append(f'{METRIC_PREFIX}_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+    lines += [
+        f"# HELP {METRIC_PREFIX}_events_total Counted events such as cache hits.",
+        f"# TYPE {METRIC_PREFIX}_events_total counter",
+    ]
+    for name, value in data['counters'].items():
+        lines.append(f'{METRIC_PREFIX}_events_total{{event="{_label(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack at a fixed interval.
+
+    Stacks are kept in collapsed form ("outer;inner;leaf" -> samples), which
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {n}" for stack, n in self.stacks.most_common())
+
+    def top_functions(self, limit=20):
+        """(function, self samples, total samples) for the busiest functions"""
+        own = Counter()
+        total = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            # Count recursive frames once per sample
+            for frame in set(frames):
+                total[frame] += n
+        ranked = sorted(total, key=lambda f: (own[f], total[f]), reverse=True)
+        return [(f, own[f], total[f]) for f in ranked[:limit]]
\ No newline at end of file
@@ -1,6 +1,140 @@
 import streamlit as st
-from deep_translator import GoogleTranslator
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from googletrans import LANGUAGES
+from document_analysis import split_into_chunks
+from db import Database
+import resources
+from jobs import register_operation, submit_job, job_panel
+import tracing
+
+# Google's endpoint rejects requests over 5000 characters
+MAX_CHUNK_CHARS = 4500
+MAX_CONCURRENCY = 4
+MAX_RETRIES = 3
+MEMORY_DB = 'translation_memory.db'
+
+class TranslationBackend:
+    """Interface for translation services: translate one chunk of text"""
+    max_chars = MAX_CHUNK_CHARS
+
+    def translate(self, text, target):
+        raise NotImplementedError
+
+class GoogleBackend(TranslationBackend):
+    def translate(self, text, target):
+        from deep_translator import GoogleTranslator
+        return GoogleTranslator(source='auto', target=target).translate(text)
+
+class StubBackend(TranslationBackend):
+    """Offline backend for tests and benchmarks; tags each chunk with the target language"""
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def translate(self, text, target):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return f"[{target}] {text}"
+
+class TranslationMemory:
+    """SQLite store of already translated segments, keyed by (segment hash, target language)"""
+    def __init__(self, path=MEMORY_DB):
+        self.db = Database(path)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS segments
+                           (segment_hash TEXT NOT NULL,
+                            target TEXT NOT NULL,
+                            translation TEXT NOT NULL,
+                            PRIMARY KEY (segment_hash, target))''')
+
+    def get_many(self, hashes, target):
+        found = {}
+        hashes = list(hashes)
+        with self.db.connection() as conn:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                found.update(conn.execute(
+                    f"SELECT segment_hash, translation FROM segments WHERE target=? AND segment_hash IN ({placeholders})",
+                    [target] + batch))
+        return found
+
+    def put_many(self, rows):
+        """Store (segment_hash, target, translation) rows in batched transactions"""
+        return self.db.executemany("INSERT OR REPLACE INTO segments VALUES (?, ?, ?)", rows)
+
+resources.register('translation_memory', TranslationMemory)
+
+def segment_hash(text):
+    return hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+
+def split_segments(text, max_chars=MAX_CHUNK_CHARS):
+    """Split text on paragraph/sentence boundaries into (leading ws, body, trailing ws) segments"""
+    segments = []
+    for _, chunk in split_into_chunks(text, max_chars):
+        body = chunk.strip()
+        lead = chunk[:len(chunk) - len(chunk.lstrip())]
+        trail = chunk[len(lead) + len(body):]
+        segments.append((lead, body, trail))
+    return segments
+
+@tracing.traced("translate.segment")
+def _translate_with_retries(backend, text, target, retries):
+    for attempt in range(retries + 1):
+        try:
+            return backend.translate(text, target)
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+def translate_text(text, target, backend=None, memory=None, concurrency=MAX_CONCURRENCY,
+                   retries=MAX_RETRIES, progress=None):
+    """Translate text of any length: chunks are looked up in the translation memory,
+    the rest are translated concurrently and everything is reassembled in order"""
+    backend = backend or GoogleBackend()
+    memory = memory or resources.get('translation_memory')
+    segments = split_segments(text, backend.max_chars)
+    hashes = [segment_hash(body) for _, body, _ in segments]
+    translations = memory.get_many(set(hashes), target)
+    
+    missing = {h: body for h, (_, body, _) in zip(hashes, segments) if body and h not in translations}
+    done = len(set(hashes)) - len(missing)
+    tracing.count("translate.memory_hit", done)
+    tracing.count("translate.memory_miss", len(missing))
+    if progress:
+        progress(done, len(set(hashes)))
+    if missing:
+        translated = []
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                futures = {pool.submit(_translate_with_retries, backend, body, target, retries): h
+                           for h, body in missing.items()}
+                try:
+                    for future in as_completed(futures):
+                        h = futures[future]
+                        translations[h] = future.result() or ""
+                        translated.append((h, target, translations[h]))
+                        done += 1
+                        if progress:
+                            progress(done, len(set(hashes)))
+                except BaseException:
+                    # Cancelled or failed: only wait for the chunks already being translated
+                    pool.shutdown(cancel_futures=True)
+                    raise
+        finally:
+            # Keep whatever was translated, even if another chunk failed
+            memory.put_many(translated)
+    
+    return "".join(lead + (translations[h] if body else "") + trail
+                   for h, (lead, body, trail) in zip(hashes, segments))
+
+def _translate_job(text, report, target):
+    return translate_text(text, target, progress=lambda done, total: report(done / total if total else 1.0))
+
+register_operation('translate', _translate_job)
 
 def translate_page():
     st.subheader("Text Translation")
@@ -14,14 +148,12 @@ def translate_page():
         lang_code = [code for code, name in LANGUAGES.items() if name == language][0]
         
         if st.button("Translate"):
-            with st.spinner("Translating..."):
-                try:
-                    translation = GoogleTranslator(
-                        source='auto', 
-                        target=lang_code
-                    ).translate(text)
-                    
-                    st.session_state.selected_text = translation
-                    st.text_area("Translated Text", translation, height=200)
-                except Exception as e:
-                    st.error(f"Translation error: {str(e)}")
\ No newline at end of file
+            st.session_state.translate_job = submit_job('translate', text, {'target': lang_code})
+        
+        job = job_panel(st.session_state.get('translate_job'))
+        if job and job['status'] == 'done':
+            translation = job['result']
+            if st.session_state.get('translate_job_shown') != job['id']:
+                st.session_state.translate_job_shown = job['id']
+                st.session_state.selected_text = translation
+            st.text_area("Translated Text", translation, height=200)
\ No newline at end of file
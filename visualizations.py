@@ -1,69 +1,25 @@
 import streamlit as st
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
-from collections import defaultdict
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
 import pandas as pd
-import spacy
+from incremental import lexical_profile
+from keywords import extract_keywords, ALGORITHMS, DEFAULT_ALGORITHM
+from rendering import render_wordcloud, render_bar_chart
+from text_metrics import compute_text_metrics
+import tracing
 
-# Load English language model for lemmatization
-nlp = spacy.load("en_core_web_sm")
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
-
-def get_unique_lemmas(text):
-    """Extract unique lemmas (base forms) from text"""
-    doc = nlp(text)
-    lemmas = set()
-    for token in doc:
-        if token.is_alpha and not token.is_stop and len(token.text) > 2:
-            lemma = token.lemma_.lower()
-            lemmas.add(lemma)
-    return lemmas
-
-def extract_unique_keywords(text, top_n=20):
+@tracing.traced("keywords.unique")
+def extract_unique_keywords(text, top_n=20, algorithm=DEFAULT_ALGORITHM):
     """Get top keywords with unique meanings"""
-    doc = nlp(text)
-    lemma_counts = defaultdict(int)
-    
-    for token in doc:
-        if (token.is_alpha and not token.is_stop and 
-            len(token.text) > 2 and token.pos_ in ['NOUN', 'PROPN', 'ADJ', 'VERB']):
-            lemma = token.lemma_.lower()
-            lemma_counts[lemma] += 1
-    
-    # Get most frequent unique lemmas
-    sorted_lemmas = sorted(lemma_counts.items(), key=lambda x: x[1], reverse=True)
-    return [lemma for lemma, count in sorted_lemmas[:top_n]]
+    return [lemma for lemma, _, _ in extract_keywords(text, top_n, algorithm)]
 
-def generate_wordcloud(text):
-    """Generate word cloud with unique meaning words"""
-    keywords = extract_unique_keywords(text, 50)
-    wordcloud = WordCloud(
-        width=1000, 
-        height=500,
-        background_color='white',
-        collocations=False,
-        prefer_horizontal=0.8
-    ).generate(' '.join(keywords))
-    
-    plt.figure(figsize=(15, 8))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis("off")
-    return plt
+def generate_wordcloud(text, algorithm=DEFAULT_ALGORITHM):
+    """Generate word cloud PNG with unique meaning words"""
+    keywords = extract_unique_keywords(text, 50, algorithm)
+    return render_wordcloud(keywords, width=1000, height=500)
 
-def generate_frequency_chart(text):
+def generate_frequency_chart(text, algorithm=DEFAULT_ALGORITHM):
     """Create frequency chart with unique meaning words"""
-    keywords = extract_unique_keywords(text, 20)
-    freq_dist = defaultdict(int)
-    
-    words = [token.lemma_.lower() for token in nlp(text) 
-             if token.is_alpha and not token.is_stop]
-    
-    for word in words:
-        freq_dist[word] += 1
+    keywords = extract_unique_keywords(text, 20, algorithm)
+    freq_dist = lexical_profile(text).totals['words']
     
     data = {kw: freq_dist[kw] for kw in keywords if kw in freq_dist}
     df = pd.DataFrame.from_dict(data, orient='index', columns=['Count'])
@@ -79,21 +35,25 @@ def visualizations_page():
                                 ["Enhanced Word Cloud", 
                                  "Keyword Frequency Chart", 
                                  "Text Metrics"])
+        if viz_option != "Text Metrics":
+            algorithm = st.selectbox("Keyword ranking", ALGORITHMS,
+                                     index=ALGORITHMS.index(DEFAULT_ALGORITHM),
+                                     format_func=lambda a: {'frequency': "Frequency", 'tfidf': "TF-IDF vs saved texts",
+                                                            'rake': "RAKE", 'textrank': "TextRank"}[a])
         
         if viz_option == "Enhanced Word Cloud":
             st.subheader("Word Cloud ")
-            plt = generate_wordcloud(text)
-            st.pyplot(plt)
+            st.image(generate_wordcloud(text, algorithm))
             
             with st.expander("Word Cloud Details"):
-                unique_words = extract_unique_keywords(text, 50)
+                unique_words = extract_unique_keywords(text, 50, algorithm)
                 st.write(f"Showing {len(unique_words)} unique meaning words:")
                 st.write(", ".join(unique_words))
         
         elif viz_option == "Keyword Frequency Chart":
             st.subheader("Keyword Frequency ")
-            df = generate_frequency_chart(text)
-            st.bar_chart(df)
+            df = generate_frequency_chart(text, algorithm)
+            st.image(render_bar_chart(df['Count'].items()))
             
             with st.expander("Frequency Details"):
                 st.dataframe(df.sort_values('Count', ascending=False))
@@ -101,28 +61,24 @@ def visualizations_page():
         elif viz_option == "Text Metrics":
             st.subheader("Text Statistics ")
             
-            # Get unique words count
-            unique_lemmas = get_unique_lemmas(text)
-            words = word_tokenize(text)
-            sentences = sent_tokenize(text)
+            # Every statistic comes from one pass over the text
+            with tracing.span("metrics.compute"):
+                metrics = compute_text_metrics(text)
             
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Characters", len(text))
+                st.metric("Characters", metrics['characters'])
             with col2:
-                st.metric("Words", len(words))
+                st.metric("Words", metrics['words'])
             with col3:
-                st.metric("Unique Words", len(unique_lemmas))
-            
-            avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
-            avg_sentence_length = len(words) / len(sentences) if sentences else 0
+                st.metric("Unique Words", metrics['unique_words'])
             
             col1, col2 = st.columns(2)
             with col1:
-                st.metric("Avg. Word Length", f"{avg_word_length:.1f} chars")
+                st.metric("Avg. Word Length", f"{metrics['avg_word_length']:.1f} chars")
             with col2:
-                st.metric("Avg. Sentence Length", f"{avg_sentence_length:.1f} words")
+                st.metric("Avg. Sentence Length", f"{metrics['avg_sentence_length']:.1f} words")
             
             with st.expander("Advanced Metrics"):
-                st.write(f"**Vocabulary Richness:** {len(unique_lemmas)/len(words):.2%}")
-                st.write(f"**Stopwords Removed:** {len([w for w in words if w.lower() in stop_words])}")
\ No newline at end of file
+                st.write(f"**Vocabulary Richness:** {metrics['vocabulary_richness']:.2%}")
+                st.write(f"**Stopwords Removed:** {metrics['stopwords']}")
\ No newline at end of file